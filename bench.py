@@ -0,0 +1,300 @@
+"""Headless scheduler benchmark
+
+Runs a GPUGrid and a scheduler in pure simulated time, as fast as
+possible, against a seeded synthetic workload or a replayed job trace and
+reports scheduling throughput, per-pass latency, makespan, utilization and
+queue wait.
+
+    python bench.py --scheduler intelligent --nodes 64 --tasks 5000 --seed 1 --output bench.json
+    python bench.py --trace jobs.csv.gz --trace-start 86400 --trace-end 172800 --time-scale 60
+"""
+import argparse
+import dataclasses
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import simpy
+
+from control_plane.backfill_scheduler import BackfillScheduler
+from control_plane.batch_scheduler import BatchScheduler
+from control_plane.models import TaskPriority, TaskStatus
+from control_plane.records import TaskSpec
+from control_plane.scheduler import FIFOScheduler, IntelligentScheduler
+from simulation.gpu_grid import GPUGrid
+from simulation.traces import TraceSpec, read_trace
+from simulation.workloads import WorkloadSpec, generate
+
+SCHEDULERS = {
+    "fifo": FIFOScheduler,
+    "intelligent": IntelligentScheduler,
+    "batch": BatchScheduler,
+    "backfill": BackfillScheduler,
+}
+
+# Metrics shown when comparing against a baseline report
+COMPARED_METRICS = [
+    ("decisions_per_second", "higher"),
+    ("schedule_pass_ms.p95", "lower"),
+    ("makespan", "lower"),
+    ("utilization", "higher"),
+    ("memory_utilization", "higher"),
+    ("stretch.mean", "lower"),
+    ("queue_wait.p50", "lower"),
+    ("queue_wait.p95", "lower"),
+    ("queue_wait.p99", "lower"),
+    ("queue_wait_by_priority.critical.p99", "lower"),
+    ("queue_wait_by_priority.low.p99", "lower"),
+]
+
+# Values kept per latency distribution; longer runs report percentiles of a uniform sample
+SAMPLE_CAPACITY = 100_000
+
+
+class _Samples:
+    """Uniform sample of at most ``capacity`` values (reservoir sampling)"""
+    
+    def __init__(self, capacity: int = SAMPLE_CAPACITY, seed: int = 0):
+        self.capacity = capacity
+        self.values: List[float] = []
+        self.count = 0
+        self.rng = random.Random(seed)
+    
+    def append(self, value: float):
+        self.count += 1
+        if len(self.values) < self.capacity:
+            self.values.append(value)
+        else:
+            index = self.rng.randrange(self.count)
+            if index < self.capacity:
+                self.values[index] = value
+
+
+def _percentiles(values: List[float], scale: float = 1.0) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    array = np.asarray(values) * scale
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(array.mean()), "max": float(array.max())}
+
+
+def _submit(env: simpy.Environment, scheduler, jobs, rejected: Dict[str, int]):
+    """SimPy process submitting each job at its arrival time
+    
+    Jobs that no node can hold, and jobs the scheduler refuses (such as a
+    repeated task id), are counted in ``rejected`` by reason and skipped,
+    so they can neither stall nor abort the run.
+    """
+    max_memory = max((node.memory_gb for node in scheduler.grid.nodes), default=0)
+    for job in jobs:
+        if job.arrival > env.now:
+            yield env.timeout(job.arrival - env.now)
+        if job.memory_required > max_memory:
+            rejected["too_large"] = rejected.get("too_large", 0) + 1
+            continue
+        try:
+            scheduler.add_task(TaskSpec(
+                task_id=job.task_id,
+                duration=job.duration,
+                memory_required=job.memory_required,
+                priority=TaskPriority(job.priority),
+            ))
+        except ValueError:
+            rejected["invalid"] = rejected.get("invalid", 0) + 1
+
+
+def run_benchmark(scheduler: str = "intelligent", num_nodes: int = 64,
+                  workload: Union[WorkloadSpec, TraceSpec, None] = None, seed: int = 0,
+                  vectorized_telemetry: Optional[bool] = None,
+                  max_time: Optional[float] = None, preemption: Optional[bool] = None,
+                  telemetry_history: bool = False) -> Dict[str, Any]:
+    """Run one headless simulation and return its report
+    
+    Jobs are generated or read lazily as they arrive, and latency
+    distributions are sampled, so memory stays bounded for traces of any
+    length. Telemetry history, which only serves the API, is off unless
+    ``telemetry_history`` is set, so it does not weigh on the measurements.
+    """
+    workload = workload or WorkloadSpec()
+    env = simpy.Environment()
+    grid = GPUGrid(env, num_nodes=num_nodes, vectorized_telemetry=vectorized_telemetry, seed=seed,
+                   telemetry_history=telemetry_history)
+    scheduler_class = SCHEDULERS[scheduler] if isinstance(scheduler, str) else scheduler
+    sched = scheduler_class(grid, preemption=preemption)
+    
+    # Time every scheduling pass
+    pass_times = _Samples(seed=seed)
+    schedule_time = 0.0
+    decisions = 0
+    schedule = sched.schedule
+    
+    def timed_schedule():
+        nonlocal decisions, schedule_time
+        start = time.perf_counter()
+        scheduled = schedule()
+        elapsed = time.perf_counter() - start
+        pass_times.append(elapsed)
+        schedule_time += elapsed
+        decisions += len(scheduled)
+        return scheduled
+    
+    sched.schedule = timed_schedule
+    
+    # Track waits (to first dispatch), busy time and completion from task transitions
+    waits = _Samples(seed=seed)
+    waits_by_priority = {priority: _Samples(seed=seed) for priority in TaskPriority}
+    busy_time = 0.0
+    memory_time = 0.0
+    runtimes: Dict[str, float] = {}
+    stretches = _Samples(seed=seed)
+    preemptions = 0
+    submitted = 0
+    rejected: Dict[str, int] = {}
+    finished = {TaskStatus.COMPLETED: 0, TaskStatus.FAILED: 0}
+    done = env.event()
+    
+    def check_done(event=None):
+        # Every job has been read and every accepted task has finished
+        if submitter.triggered and sum(finished.values()) == submitted and not done.triggered:
+            done.succeed()
+    
+    def on_transition(task, old_status, new_status):
+        nonlocal busy_time, memory_time, preemptions, submitted
+        if old_status is None:
+            submitted += 1
+        elif old_status == TaskStatus.RUNNING and task.start_time is not None:
+            runtime = env.now - task.start_time
+            busy_time += runtime
+            memory_time += runtime * task.request.memory_required
+            runtimes[task.task_id] = runtimes.get(task.task_id, 0.0) + runtime
+        if new_status == TaskStatus.RUNNING and not task.preemptions:
+            wait = env.now - task.submit_time
+            waits.append(wait)
+            waits_by_priority[task.request.priority].append(wait)
+        elif new_status == TaskStatus.PENDING and old_status == TaskStatus.RUNNING:
+            preemptions += 1
+        elif new_status in finished:
+            finished[new_status] += 1
+            # Running time over requested duration (1.0 = never slowed down by throttling)
+            runtime = runtimes.pop(task.task_id, 0.0)
+            if new_status == TaskStatus.COMPLETED:
+                stretches.append(runtime / task.request.duration)
+            check_done()
+    
+    sched.tasks.listeners.append(on_transition)
+    sched.start()
+    jobs = read_trace(workload) if isinstance(workload, TraceSpec) else generate(workload, seed)
+    submitter = env.process(_submit(env, sched, jobs, rejected))
+    submitter.callbacks.append(check_done)
+    
+    start = time.perf_counter()
+    until = done if max_time is None else env.any_of([done, env.timeout(max_time)])
+    env.run(until=until)
+    wall_time = time.perf_counter() - start
+    
+    makespan = env.now
+    total_memory = sum(node.memory_gb for node in grid.nodes)
+    return {
+        "scheduler": scheduler if isinstance(scheduler, str) else scheduler.__name__,
+        "num_nodes": num_nodes,
+        "seed": seed,
+        "workload": dataclasses.asdict(workload),
+        "tasks_submitted": submitted,
+        # Jobs skipped because no node can hold them or the scheduler refused them
+        "tasks_rejected": sum(rejected.values()),
+        "tasks_rejected_by_reason": rejected,
+        "tasks_completed": finished[TaskStatus.COMPLETED],
+        "tasks_failed": finished[TaskStatus.FAILED],
+        "makespan": makespan,
+        # Average running tasks per node (above 1 when tasks share GPUs)
+        "utilization": busy_time / (num_nodes * makespan) if makespan else 0.0,
+        "memory_utilization": memory_time / (total_memory * makespan) if makespan else 0.0,
+        "queue_wait": _percentiles(waits.values),
+        "queue_wait_by_priority": {priority.value: _percentiles(samples.values)
+                                   for priority, samples in waits_by_priority.items()},
+        "preemptions": preemptions,
+        "stretch": _percentiles(stretches.values),
+        "schedule_pass_ms": _percentiles(pass_times.values, scale=1000.0),
+        "schedule_passes": pass_times.count,
+        "schedule_time": schedule_time,
+        "decisions": decisions,
+        "decisions_per_second": decisions / schedule_time if schedule_time else 0.0,
+        "wall_time": wall_time,
+        "sim_speedup": makespan / wall_time if wall_time else 0.0,
+    }
+
+
+def _metric(report: Dict[str, Any], path: str) -> float:
+    value: Any = report
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable metric changes against a baseline report"""
+    lines = []
+    for path, better in COMPARED_METRICS:
+        try:
+            new, old = _metric(report, path), _metric(baseline, path)
+        except KeyError:
+            # Baseline from a version without this metric
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        improved = change > 0 if better == "higher" else change < 0
+        marker = "" if abs(change) < 1 else (" (better)" if improved else " (worse)")
+        lines.append(f"{path:36s} {old:12.3f} -> {new:12.3f}  {change:+7.1f}%{marker}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Headless GPU scheduler benchmark")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="intelligent")
+    parser.add_argument("--nodes", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--arrival", choices=["poisson", "bursty"], default="poisson")
+    parser.add_argument("--rate", type=float, default=1.0, help="Mean arrivals per simulated second")
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vectorized", action="store_true", help="Use the vectorized telemetry engine")
+    parser.add_argument("--telemetry-history", action="store_true",
+                        help="Record telemetry history as the API does (off by default)")
+    parser.add_argument("--max-time", type=float, default=None, help="Stop after this much simulated time")
+    parser.add_argument("--preemption", action="store_true", help="Preempt lower-priority running tasks")
+    parser.add_argument("--trace", help="Replay this CSV job trace (.gz/.bz2/.xz) instead of a synthetic workload")
+    parser.add_argument("--trace-start", type=float, default=None, help="Skip trace jobs arriving before this time")
+    parser.add_argument("--trace-end", type=float, default=None, help="Stop at the first trace job arriving at this time")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Divide trace arrivals and durations by this factor")
+    parser.add_argument("--trace-column", action="append", default=[], metavar="FIELD=COLUMN",
+                        help="Trace column of a job field (task_id, arrival, duration, memory_required, priority)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report")
+    args = parser.parse_args(argv)
+    
+    if args.trace:
+        columns = dict(mapping.split("=", 1) for mapping in args.trace_column)
+        workload = TraceSpec(args.trace, start=args.trace_start, end=args.trace_end,
+                             time_scale=args.time_scale, columns=columns)
+    else:
+        workload = WorkloadSpec(num_tasks=args.tasks, arrival=args.arrival, rate=args.rate,
+                                burst_size=args.burst_size)
+    report = run_benchmark(args.scheduler, args.nodes, workload, args.seed,
+                           vectorized_telemetry=args.vectorized or None, max_time=args.max_time,
+                           preemption=args.preemption or None, telemetry_history=args.telemetry_history)
+    
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)))
+
+
+if __name__ == "__main__":
+    main()
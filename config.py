@@ -2,22 +2,48 @@ import json
 import os
 from typing import Dict, Any
 
+# Score weights of the IntelligentScheduler; SCHEDULER_WEIGHTS overrides them per key
+DEFAULT_SCHEDULER_WEIGHTS = {"temperature": 0.4, "memory": 0.3, "utilization": 0.3, "packing": 0.3, "thermal": 1.0}
+
 class Config:
     """Configuration management for the GPU orchestrator"""
     
     # Simulation settings
-    SIMULATION_SPEED = 1.0  # Real-time factor
+    SIMULATION_SPEED = 1.0  # Real-time factor (simulated seconds per second, 0 = as fast as possible)
     NUM_GPU_NODES = 8       # Default number of GPU nodes to simulate
     MAX_GPU_TEMPERATURE = 85  # °C - thermal throttling threshold
+    THROTTLE_SPEED = 0.5    # Work rate of tasks on a throttled node (1.0 = throttling does not slow tasks)
     MAX_GPU_POWER = 300     # Watts - max power consumption
+    VECTORIZED_TELEMETRY = False  # Update all node telemetry in one NumPy batch (large grids)
+    GRID_SHARDS = 0  # Worker processes for a sharded grid of NUM_GPU_NODES nodes (0 = single-process grid)
+    SHARD_NODE_REFRESH = 10  # Simulated seconds between per-node status gathers from the shards
+    
+    # Telemetry history (fixed-size ring buffers, memory grows only with node count)
+    TELEMETRY_HISTORY = True
+    TELEMETRY_RAW_SECONDS = 300  # 1s samples kept per node
+    TELEMETRY_ROLLUPS = {10: 360, 60: 720}  # Rollup period (s) -> min/mean/max buckets kept
+    
+    # Durable scheduler state: write-ahead log and snapshots (empty = in memory only)
+    STATE_DIR = ""
+    STATE_FLUSH_INTERVAL = 1.0  # Simulated seconds between batched log writes
+    STATE_SNAPSHOT_INTERVAL = 300  # Simulated seconds between snapshots
+    STATE_SNAPSHOT_RECORDS = 100000  # Also snapshot once the log holds this many records
+    STATE_FSYNC = False  # fsync every log write (snapshots are always fsynced)
     
     # API settings
     API_HOST = "0.0.0.0"
     API_PORT = 8000
     DASHBOARD_PORT = 8050
+    DASHBOARD_ENABLED = True  # Serve the dashboard alongside the API from main.py (imported only when enabled)
+    STREAM_KEYFRAME_INTERVAL = 30  # Ticks between full keyframes on the telemetry stream
+    BULK_BATCH_SIZE = 1000  # Tasks validated and inserted together by POST /tasks/bulk
+    METRICS_ENABLED = False  # Collect hot-path timings and expose them on GET /metrics
     
     # Scheduler settings
+    SCHEDULER_POLICY = "intelligent"  # Scheduler behind the API: fifo, intelligent, batch or backfill
     SCHEDULER_INTERVAL = 5  # seconds between scheduling runs
+    SCHEDULER_WEIGHTS = dict(DEFAULT_SCHEDULER_WEIGHTS)  # IntelligentScheduler score weights (missing keys keep their defaults)
+    SCHEDULER_PREEMPTION = False  # Interrupt lower-priority running tasks when a higher-priority one cannot be placed
     MAX_TASK_DURATION = 300  # seconds
     
     # Default GPU node configurations
@@ -41,4 +67,5 @@ class Config:
     def to_dict(cls) -> Dict[str, Any]:
         """Convert configuration to dictionary"""
         return {key: value for key, value in cls.__dict__.items() 
-                if not key.startswith('_') and not callable(value)}
\ No newline at end of file
+                if not key.startswith('_') and not callable(value)
+                and not isinstance(value, (classmethod, staticmethod))}
\ No newline at end of file
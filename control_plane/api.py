@@ -1,12 +1,24 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+import asyncio
 import simpy
 import json
 
-from .models import TaskRequest, Task, ClusterStatus
+from .models import (TaskRequest, Task, TaskPriority, TaskStatus, ClusterStatus, BulkItemResult,
+                     BulkSubmitResponse, TaskLookupRequest, TaskLookupResponse, TaskPage)
+from . import metrics
+from .records import TaskSpec
+from .backfill_scheduler import BackfillScheduler
 from .scheduler import IntelligentScheduler, FIFOScheduler
+from .sharding import ShardedGrid, ShardedScheduler
+from .simulation_actor import SimulationActor
+from .state_log import StateLog
+from .streaming import keyframe_event
 from simulation.gpu_grid import GPUGrid
+from config import Config
 
 app = FastAPI(title="AI GPU Cluster Control Plane API", version="1.0.0")
 
@@ -19,84 +31,334 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state
-env = simpy.Environment()
-grid = GPUGrid(env, num_nodes=8)
-scheduler = IntelligentScheduler(grid)
+# Request timings (a pass-through while metrics are disabled)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Scheduling policies selectable with Config.SCHEDULER_POLICY; "batch"
+# is resolved in scheduler_class so NumPy is only loaded when it is used
+SCHEDULERS = {
+    "fifo": FIFOScheduler,
+    "intelligent": IntelligentScheduler,
+    "backfill": BackfillScheduler,
+}
+
+def scheduler_class(policy: str):
+    """Scheduler class for a Config.SCHEDULER_POLICY value"""
+    if policy == "batch":
+        from .batch_scheduler import BatchScheduler
+        return BatchScheduler
+    return SCHEDULERS[policy]
+
+# Global state, owned by the simulation actor thread. Built on startup
+# rather than at import, so it follows the configuration the launcher
+# loaded and importing this module never starts a simulation.
+env: Optional[simpy.Environment] = None
+grid = None
+scheduler = None
+state_log: Optional[StateLog] = None
+actor: Optional[SimulationActor] = None
+
+def build_simulation():
+    """Build the one simulation the API serves, from the current ``Config``"""
+    global env, grid, scheduler, state_log, actor
+    if actor is not None:
+        return
+    if Config.METRICS_ENABLED:
+        metrics.enable()
+    if Config.GRID_SHARDS:
+        if Config.STATE_DIR:
+            print("STATE_DIR is not supported with GRID_SHARDS, state will not be persisted")
+        # The policy places tasks inside every shard
+        grid = ShardedGrid(Config.NUM_GPU_NODES, Config.GRID_SHARDS,
+                           scheduler_class=scheduler_class(Config.SCHEDULER_POLICY))
+        scheduler = ShardedScheduler(grid)
+        env = grid.env
+    else:
+        recovered = None
+        if Config.STATE_DIR:
+            # Pick up the queue, history and clock from the last run
+            state_log = StateLog(Config.STATE_DIR)
+            recovered = state_log.recover(Config.NUM_GPU_NODES)
+        env = simpy.Environment(initial_time=recovered.time if recovered else 0)
+        grid = GPUGrid(env, num_nodes=Config.NUM_GPU_NODES,
+                       gpu_types=recovered.gpu_types if recovered else None)
+        scheduler = scheduler_class(Config.SCHEDULER_POLICY)(grid)
+        if state_log is not None:
+            state_log.attach(scheduler, recovered)
+    actor = SimulationActor(env, grid, scheduler)
 
 @app.on_event("startup")
 async def startup_event():
-    """Start the simulation environment when the app starts"""
-    # Start the simulation in the background
-    import threading
-    def run_simulation():
-        while True:
-            env.run(until=env.now + 10)  # Run in 10-second increments
-    
-    thread = threading.Thread(target=run_simulation, daemon=True)
-    thread.start()
+    """Build the simulation and start its actor when the app starts"""
+    build_simulation()
+    actor.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the simulation actor"""
+    actor.stop()
+    if state_log is not None:
+        state_log.close()
+    if isinstance(grid, ShardedGrid):
+        grid.close()
+
+# Commands executed on the actor thread. The simulation works on internal
+# task records; these convert them to models (copies) so handlers never
+# serialize objects the simulation is still mutating
+
+def _add_task(task_spec: TaskSpec) -> Task:
+    return scheduler.add_task(task_spec).to_model()
+
+def _query_tasks(filters: Dict[str, Any], fields: Optional[set]) -> Tuple[List[Dict[str, Any]], Optional[int], int]:
+    tasks, next_cursor, count = scheduler.tasks.query(**filters)
+    return [task.as_dict(fields) for task in tasks], next_cursor, count
+
+def _get_task(task_id: str) -> Optional[Task]:
+    task = scheduler.get_task(task_id)
+    return task.to_model() if task else None
+
+def _add_tasks(task_specs: List[TaskSpec]) -> List[Optional[str]]:
+    return scheduler.add_tasks(task_specs)
+
+def _lookup_tasks(task_ids: List[str]) -> Tuple[List[Task], List[str]]:
+    found, missing = [], []
+    for task_id in task_ids:
+        task = scheduler.get_task(task_id)
+        if task:
+            found.append(task.to_model())
+        else:
+            missing.append(task_id)
+    return found, missing
+
+def _run_scheduler() -> List[Task]:
+    return [task.to_model() for task in scheduler.schedule()]
 
 @app.post("/tasks", response_model=Task)
 async def submit_task(task_request: TaskRequest):
     """Submit a new task to the cluster"""
     try:
-        task = scheduler.add_task(task_request)
+        task = await actor.submit(_add_task, TaskSpec.from_request(task_request))
         return task
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/tasks", response_model=List[Task])
-async def get_tasks():
-    """Get all tasks (queued and running)"""
-    all_tasks = scheduler.task_queue + list(scheduler.running_tasks.values())
-    return all_tasks
+_task_list_adapter = TypeAdapter(List[TaskRequest])
+
+def _validate_batch(items: List[Any], offset: int) -> Tuple[List[TaskRequest], List[BulkItemResult]]:
+    """Validate a batch in one pass, falling back to per-item validation on errors"""
+    try:
+        return _task_list_adapter.validate_python(items), []
+    except ValidationError:
+        pass
+    valid, rejected = [], []
+    for i, item in enumerate(items):
+        try:
+            valid.append(TaskRequest.model_validate(item))
+        except ValidationError as e:
+            task_id = item.get("task_id") if isinstance(item, dict) else None
+            rejected.append(BulkItemResult(index=offset + i, task_id=task_id, accepted=False,
+                                           error=str(e.errors()[0]["msg"])))
+    return valid, rejected
+
+async def _iter_bulk_items(request: Request):
+    """Yield raw items from a JSON array body or a streamed NDJSON body"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+    else:
+        items = json.loads(await request.body())
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array of tasks")
+        for item in items:
+            yield item
+
+@app.post("/tasks/bulk", response_model=BulkSubmitResponse)
+async def submit_tasks_bulk(request: Request):
+    """Submit many tasks as a JSON array or an NDJSON stream
+    
+    Items are validated and inserted in batches of ``Config.BULK_BATCH_SIZE``;
+    each batch is added to the scheduler in one step. Returns a result per item.
+    """
+    results: List[BulkItemResult] = []
+    batch: List[Any] = []
+    offset = 0
+    
+    async def flush():
+        nonlocal batch, offset
+        valid, rejected = _validate_batch(batch, offset)
+        rejected_indexes = {result.index for result in rejected}
+        indexes = [offset + i for i in range(len(batch)) if offset + i not in rejected_indexes]
+        specs = [TaskSpec.from_request(task_request) for task_request in valid]
+        errors = await actor.submit(_add_tasks, specs) if specs else []
+        for index, task_request, error in zip(indexes, valid, errors):
+            results.append(BulkItemResult(index=index, task_id=task_request.task_id,
+                                          accepted=error is None, error=error))
+        results.extend(rejected)
+        offset += len(batch)
+        batch = []
+    
+    try:
+        async for item in _iter_bulk_items(request):
+            batch.append(item)
+            if len(batch) >= Config.BULK_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+    except ValueError as e:
+        # Malformed JSON; batches already flushed stay submitted
+        raise HTTPException(status_code=400, detail=f"Invalid body after {offset + len(batch)} items: {e}")
+    
+    results.sort(key=lambda result: result.index)
+    accepted = sum(1 for result in results if result.accepted)
+    return BulkSubmitResponse(accepted=accepted, rejected=len(results) - accepted, results=results)
+
+@app.post("/tasks/lookup", response_model=TaskLookupResponse)
+async def lookup_tasks(lookup: TaskLookupRequest):
+    """Get the status of many tasks by ID"""
+    tasks, missing = await actor.submit(_lookup_tasks, lookup.task_ids)
+    return TaskLookupResponse(tasks=tasks, missing=missing)
+
+@app.get("/tasks", response_model=TaskPage)
+async def get_tasks(status: Optional[List[TaskStatus]] = Query(None),
+                    priority: Optional[TaskPriority] = None,
+                    assigned_node: Optional[int] = None,
+                    submitted_after: Optional[float] = None,
+                    submitted_before: Optional[float] = None,
+                    cursor: Optional[str] = None,
+                    limit: int = Query(100, ge=1, le=1000),
+                    fields: Optional[str] = Query(None, description="Comma-separated task fields to return"),
+                    count_only: bool = False):
+    """Get tasks (queued, running and recently finished), filtered and paginated
+    
+    Tasks are returned in submission order. Pass ``next_cursor`` back as
+    ``cursor`` to get the next page; ``count_only`` skips the tasks and only
+    returns how many match. Pages leave ``count`` empty unless it comes
+    straight from an index (no filters, or one status, on the first page).
+    """
+    try:
+        after = int(cursor) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    projection = None
+    if fields:
+        projection = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = projection - set(Task.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    filters = {
+        "statuses": status,
+        "priority": priority,
+        "assigned_node": assigned_node,
+        "submitted_after": submitted_after,
+        "submitted_before": submitted_before,
+        "after": after,
+        "limit": None if count_only else limit,
+    }
+    tasks, next_cursor, count = await actor.submit(_query_tasks, filters, projection)
+    return TaskPage(tasks=tasks, count=count,
+                    next_cursor=str(next_cursor) if next_cursor is not None else None)
 
 @app.get("/tasks/{task_id}", response_model=Task)
 async def get_task(task_id: str):
     """Get a specific task by ID"""
-    for task in scheduler.task_queue:
-        if task.task_id == task_id:
-            return task
-    if task_id in scheduler.running_tasks:
-        return scheduler.running_tasks[task_id]
+    task = await actor.submit(_get_task, task_id)
+    if task:
+        return task
     raise HTTPException(status_code=404, detail="Task not found")
 
+def _snapshot_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-encoded snapshot bytes, or 304 if the client already has them"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or
+                          etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 @app.get("/cluster/status", response_model=ClusterStatus)
-async def get_cluster_status():
+async def get_cluster_status(request: Request):
     """Get current cluster status"""
-    grid_status = grid.get_grid_status()
-    
-    return ClusterStatus(
-        timestamp=grid_status["timestamp"],
-        nodes=grid_status["nodes"],
-        available_nodes=grid_status["available_nodes"],
-        total_nodes=grid_status["total_nodes"],
-        pending_tasks=len(scheduler.task_queue),
-        running_tasks=len(scheduler.running_tasks)
-    )
+    snapshot = actor.snapshot
+    return _snapshot_response(request, snapshot.status_body, snapshot.etag)
 
 @app.get("/nodes", response_model=List[Dict[str, Any]])
-async def get_nodes():
+async def get_nodes(request: Request):
     """Get all nodes in the cluster"""
-    return grid.get_grid_status()["nodes"]
+    snapshot = actor.snapshot
+    return _snapshot_response(request, snapshot.nodes_body, snapshot.etag)
+
+@app.get("/stream")
+async def stream_cluster():
+    """Stream cluster changes as Server-Sent Events
+    
+    Starts with a ``keyframe`` event (the full cluster status), followed by
+    one ``delta`` event per tick with only the changed node fields and task
+    state transitions. Periodic keyframes resynchronize clients.
+    """
+    snapshot = actor.snapshot
+    subscriber = actor.stream.subscribe(snapshot.version)
+    
+    async def events():
+        try:
+            yield keyframe_event(snapshot.version, snapshot.status_body)
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            actor.stream.unsubscribe(subscriber)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
 @app.get("/nodes/{node_id}", response_model=Dict[str, Any])
 async def get_node(node_id: int):
     """Get a specific node by ID"""
-    node = grid.get_node_by_id(node_id)
-    if node:
-        return node.get_status()
+    nodes = actor.snapshot.status["nodes"]
+    if 0 <= node_id < len(nodes):
+        return nodes[node_id]
     raise HTTPException(status_code=404, detail="Node not found")
 
+def _query_telemetry(node_id: int, start: Optional[float], end: Optional[float],
+                     step: Optional[float]) -> Dict[str, Any]:
+    return grid.telemetry_history.query(node_id, start, end, step)
+
+@app.get("/nodes/{node_id}/telemetry", response_model=Dict[str, Any])
+async def get_node_telemetry(node_id: int,
+                             start: Optional[float] = Query(None, alias="from"),
+                             end: Optional[float] = Query(None, alias="to"),
+                             step: Optional[float] = Query(None, gt=0)):
+    """Get telemetry history of a node, downsampled to ``step`` seconds"""
+    if grid.telemetry_history is None:
+        raise HTTPException(status_code=404, detail="Telemetry history is disabled")
+    if grid.get_node_by_id(node_id) is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return await actor.submit(_query_telemetry, node_id, start, end, step)
+
 @app.post("/scheduler/run")
 async def run_scheduler():
     """Manually trigger the scheduler"""
     try:
-        scheduled = scheduler.schedule()
+        scheduled = await actor.submit(_run_scheduler)
         return {"scheduled_tasks": len(scheduled), "tasks": scheduled}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Hot-path timings and simulation counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     """API root endpoint"""
@@ -105,9 +367,13 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "submit_task": "POST /tasks",
+            "submit_tasks_bulk": "POST /tasks/bulk",
+            "lookup_tasks": "POST /tasks/lookup",
             "get_tasks": "GET /tasks",
             "get_cluster_status": "GET /cluster/status",
             "get_nodes": "GET /nodes",
-            "run_scheduler": "POST /scheduler/run"
+            "stream": "GET /stream",
+            "run_scheduler": "POST /scheduler/run",
+            "metrics": "GET /metrics"
         }
     }
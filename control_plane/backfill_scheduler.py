@@ -0,0 +1,93 @@
+from typing import List, Optional, Tuple
+
+from .records import TaskRecord
+from . import metrics
+from .scheduler import IntelligentScheduler
+from simulation.gpu_node import GPUNode
+
+# (node, expected start, memory left over on the node at that start) of the reserved task
+Reservation = Tuple[GPUNode, float, float]
+
+
+class BackfillScheduler(IntelligentScheduler):
+    """EASY backfilling scheduler that uses task durations
+    
+    Pending tasks are placed in arrival order on the best-scoring node, as
+    by the IntelligentScheduler, until one cannot start anywhere. That task
+    gets a reservation on the node where enough memory is expected to free
+    up first, from the expected end of the tasks running there. The tasks
+    behind it are then only backfilled where they cannot delay it: on any
+    other node, or on the reserved node if they are expected to finish
+    before the reservation starts or fit in the memory it leaves over.
+    A large task at the head of the queue therefore no longer waits behind
+    a stream of small ones, and the capacity it waits for is still used.
+    
+    Like the FIFOScheduler it ignores priorities (set ``priority_dispatch``
+    to reserve for the most urgent blocked task instead, which also allows
+    preemption). Expected ends assume the node keeps its current speed;
+    throttling can push a backfilled task past the reservation, delaying it
+    by the overrun.
+    """
+    
+    priority_dispatch = False
+    
+    @metrics.instrumented(metrics.SCHEDULE_SECONDS)
+    def schedule(self) -> List[TaskRecord]:
+        """Schedule tasks in queue order, backfilling around one reservation"""
+        scheduled = []
+        reservation: Optional[Reservation] = None
+        for task in self._queue():
+            if not len(self.grid.availability):
+                break
+            if reservation is None:
+                node = self._find_optimal_node(task)
+                if node is None:
+                    if metrics.enabled:
+                        metrics.PLACEMENT_FAILURES.inc()
+                    # A task too large for every node is skipped rather than reserved for
+                    reservation = self._reserve(task)
+                    continue
+            else:
+                node = self._find_backfill_node(task, reservation)
+                if node is None:
+                    continue
+                reserved, start, spare = reservation
+                if node is reserved and self._expected_end(task, node) > start:
+                    reservation = (reserved, start, spare - task.request.memory_required)
+            if self._dispatch(task, node):
+                scheduled.append(task)
+        return scheduled
+    
+    def _expected_end(self, task: TaskRecord, node: GPUNode) -> float:
+        """Time a task would end if started on a node now, at the node's current speed"""
+        return self.grid.env.now + (task.request.duration - task.progress) / node.speed
+    
+    def _reserve(self, task: TaskRecord) -> Optional[Reservation]:
+        """Reserve the node that is expected to fit a task the soonest"""
+        memory_required = task.request.memory_required
+        reservation = None
+        for node in self.grid.nodes:
+            start = node.available_at(memory_required)
+            if start is not None and (reservation is None or start < reservation[1]):
+                spare = node.free_memory + sum(
+                    node.tasks[task_id].get('memory_required', node.memory_gb)
+                    for task_id, end in node.task_ends.items() if end <= start
+                ) - memory_required
+                reservation = (node, start, spare)
+        return reservation
+    
+    def _find_backfill_node(self, task: TaskRecord, reservation: Reservation) -> Optional[GPUNode]:
+        """Best node for a task that leaves the reservation intact"""
+        reserved, start, spare = reservation
+        memory_required = task.request.memory_required
+        best_node, best_score = None, float("-inf")
+        for node in self.grid.availability.candidates(memory_required, exclude=reserved):
+            score = self._calculate_node_score(node, task)
+            if score > best_score:
+                best_node, best_score = node, score
+        if reserved in self.grid.availability and reserved.free_memory >= memory_required \
+                and (self._expected_end(task, reserved) <= start or memory_required <= spare):
+            score = self._calculate_node_score(reserved, task)
+            if score > best_score:
+                best_node = reserved
+        return best_node
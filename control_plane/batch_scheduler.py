@@ -0,0 +1,170 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .records import TaskRecord
+from . import metrics
+from .scheduler import PRIORITY_RANK, IntelligentScheduler
+from simulation.gpu_grid import GPUGrid
+from simulation.thermal import RECOVERY_TEMPERATURE, RECOVERY_TIME, THROTTLE_TEMPERATURE, heating_rate
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # SciPy is optional, the greedy solver is used instead
+    linear_sum_assignment = None
+
+# Cost given to infeasible pairs in the optimal solver
+_INFEASIBLE_COST = 1e9
+
+# Score added per priority level; larger than any node score so higher priorities are placed first
+_PRIORITY_BONUS = 10.0
+
+
+def throttled_fraction(temperature, load, duration):
+    """Expected fraction of the next ``duration`` seconds spent throttled at a constant load
+    
+    Vectorized form of ``GPUNode.projected_throttle`` for a constant load:
+    arguments may be NumPy arrays that broadcast together.
+    """
+    rate = heating_rate(load)
+    headroom = np.maximum(THROTTLE_TEMPERATURE - temperature, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reheat_time = (THROTTLE_TEMPERATURE - RECOVERY_TEMPERATURE) / np.maximum(rate, 1e-9)
+        share = RECOVERY_TIME / (RECOVERY_TIME + reheat_time)
+        onset = np.where(rate > 0, headroom / np.maximum(rate, 1e-9), np.inf)
+        fraction = np.clip(1 - onset / duration, 0.0, 1.0) * share
+    return np.where(rate > 0, fraction, 0.0)
+
+
+class BatchScheduler(IntelligentScheduler):
+    """Scheduler that places a whole batch of pending tasks in one pass
+    
+    Builds a task x node score matrix with the IntelligentScheduler weights,
+    masks out nodes without enough free memory and solves the assignment in
+    one go per round. Small problems are solved optimally with SciPy's
+    ``linear_sum_assignment`` (a requirement, but the module still imports
+    without it); larger ones, or all of them without SciPy, use a greedy
+    approximation that lets the largest tasks pick first.
+    """
+    
+    def __init__(self, grid: GPUGrid, history_size: int = 10000, preemption: Optional[bool] = None,
+                 max_batch: int = 1024, optimal_max_cells: int = 250000):
+        super().__init__(grid, history_size=history_size, preemption=preemption)
+        self.max_batch = max_batch
+        self.optimal_max_cells = optimal_max_cells
+        self.last_solve_time = 0.0
+        self.solve_times = deque(maxlen=1000)
+    
+    @metrics.instrumented(metrics.SCHEDULE_SECONDS)
+    def schedule(self) -> List[TaskRecord]:
+        """Schedule pending tasks in assignment rounds until a round places nothing
+        
+        A round places at most one task per node, so nodes shared by memory
+        are filled over several rounds.
+        """
+        scheduled = []
+        while True:
+            placed = self._schedule_round()
+            if not placed:
+                return scheduled
+            scheduled.extend(placed)
+    
+    def _schedule_round(self) -> List[TaskRecord]:
+        """Schedule up to ``max_batch`` pending tasks with one assignment solve
+        
+        Tasks no available node has the memory for are skipped, so they do
+        not take the places of later tasks that would fit.
+        """
+        nodes = self.grid.get_available_nodes()
+        if not nodes:
+            return []
+        max_free = max(node.free_memory for node in nodes)
+        batch = []
+        for task in self._queue():
+            if task.request.memory_required > max_free:
+                continue
+            batch.append(task)
+            if len(batch) >= self.max_batch:
+                break
+        if not batch:
+            return []
+        
+        ranks = np.fromiter((PRIORITY_RANK[task.request.priority] for task in batch), int, len(batch))
+        scores = self._score_matrix(batch, nodes, ranks)
+        start = time.perf_counter()
+        pairs = self._solve(scores, ranks)
+        self.last_solve_time = time.perf_counter() - start
+        self.solve_times.append(self.last_solve_time)
+        if metrics.enabled and not pairs:
+            metrics.PLACEMENT_FAILURES.inc(len(batch))
+        
+        scheduled = []
+        for task_index, node_index in pairs:
+            task = batch[task_index]
+            if self._dispatch(task, nodes[node_index]):
+                scheduled.append(task)
+        return scheduled
+    
+    def _score_matrix(self, tasks: List[TaskRecord], nodes: List, ranks: np.ndarray) -> np.ndarray:
+        """Vectorized ``_calculate_node_score`` plus priority bonus for every task/node pair (-inf if infeasible)"""
+        temperature = np.fromiter((node.telemetry.temperature for node in nodes), float, len(nodes))
+        utilization = np.fromiter((node.telemetry.utilization for node in nodes), float, len(nodes))
+        free_memory = np.fromiter((node.free_memory for node in nodes), float, len(nodes))
+        memory_required = np.fromiter((task.request.memory_required for task in tasks), float, len(tasks))
+        
+        node_score = ((85 - temperature) / 85 * self.temperature_weight
+                      + (100 - utilization) / 100 * self.utilization_weight)
+        memory_gb = np.fromiter((node.memory_gb for node in nodes), float, len(nodes))
+        fit = memory_required[:, None] / np.maximum(free_memory, 1e-9)[None, :]
+        leftover = (free_memory[None, :] - memory_required[:, None]) / np.maximum(memory_gb, 1e-9)[None, :]
+        scores = node_score[None, :] + fit * self.memory_weight + (1 - leftover) * self.packing_weight
+        if self.thermal_weight:
+            # Lookahead at the load after placement, ignoring tasks that end within the window
+            used_memory = memory_gb - free_memory
+            load = np.minimum((used_memory[None, :] + memory_required[:, None]) / np.maximum(memory_gb, 1e-9)[None, :], 1.0)
+            duration = np.fromiter((task.request.duration - task.progress for task in tasks), float, len(tasks))
+            scores -= throttled_fraction(temperature[None, :], load, duration[:, None]) * self.thermal_weight
+        scores += (len(PRIORITY_RANK) - 1 - ranks)[:, None] * _PRIORITY_BONUS
+        scores[fit > 1.0] = -np.inf
+        return scores
+    
+    def _solve(self, scores: np.ndarray, ranks: np.ndarray) -> List[Tuple[int, int]]:
+        """Return (task index, node index) pairs maximizing the total score"""
+        if linear_sum_assignment is not None and scores.size <= self.optimal_max_cells:
+            return self._solve_optimal(scores)
+        return self._solve_greedy(scores, ranks)
+    
+    def _solve_optimal(self, scores: np.ndarray) -> List[Tuple[int, int]]:
+        feasible = np.isfinite(scores)
+        # The penalty dominates any score, so the number of placed tasks is maximized first
+        cost = np.where(feasible, -scores, _INFEASIBLE_COST)
+        rows, cols = linear_sum_assignment(cost)
+        return [(int(r), int(c)) for r, c in zip(rows, cols) if feasible[r, c]]
+    
+    def _solve_greedy(self, scores: np.ndarray, ranks: np.ndarray) -> List[Tuple[int, int]]:
+        # Higher priorities choose first; within a priority the largest
+        # tasks have the fewest feasible nodes, so they choose first
+        scores = scores.copy()
+        feasible_counts = np.isfinite(scores).sum(axis=1)
+        pairs = []
+        for task_index in np.lexsort((feasible_counts, ranks)):
+            if len(pairs) == scores.shape[1]:
+                break
+            node_index = int(np.argmax(scores[task_index]))
+            if not np.isfinite(scores[task_index, node_index]):
+                continue
+            pairs.append((int(task_index), node_index))
+            scores[:, node_index] = -np.inf
+        return pairs
+    
+    def get_queue_status(self) -> Dict[str, any]:
+        """Queue status plus assignment solve times"""
+        status = super().get_queue_status()
+        status["solver"] = {
+            "last_solve_time": self.last_solve_time,
+            "mean_solve_time": sum(self.solve_times) / len(self.solve_times) if self.solve_times else 0.0,
+            "max_solve_time": max(self.solve_times, default=0.0),
+        }
+        return status
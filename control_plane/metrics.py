@@ -0,0 +1,264 @@
+"""Low-overhead instrumentation with Prometheus text exposition
+
+Hot-path methods are marked with ``@instrumented(histogram)``. The
+decorator leaves the method untouched; ``enable()`` swaps in timing
+wrappers and ``disable()`` restores the originals, so instrumentation
+costs nothing while it is off. Counters and gauges are plain attribute
+updates that callers guard with ``metrics.enabled``.
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from simulation.gpu_grid import GPUGrid
+
+# Latency buckets in seconds, from microseconds (single node lookups) to seconds (large passes)
+LATENCY_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = False
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+    
+    def _series(self) -> List[Tuple[Tuple[str, ...], "_Metric"]]:
+        if self.label_names:
+            return sorted(self._children.items())
+        return [((), self)]
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._render_values(self.name, self.label_names, values))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.value = 0.0
+    
+    def _new_child(self) -> "Counter":
+        child = Counter.__new__(Counter)
+        child.value = 0.0
+        child._lock = threading.Lock()
+        return child
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def _render_values(self, name, label_names, values) -> List[str]:
+        return [f"{name}_total{_format_labels(label_names, values)} {self.value}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.value = 0.0
+    
+    def _new_child(self) -> "Gauge":
+        child = Gauge.__new__(Gauge)
+        child.value = 0.0
+        return child
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def _render_values(self, name, label_names, values) -> List[str]:
+        return [f"{name}{_format_labels(label_names, values)} {self.value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self._init_values(buckets)
+    
+    def _init_values(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+    
+    def _new_child(self) -> "Histogram":
+        child = Histogram.__new__(Histogram)
+        child._init_values(self.buckets)
+        return child
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+    
+    def _render_values(self, name, label_names, values) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{name}_bucket{_format_labels(label_names, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(label_names, values)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(label_names, values)} {cumulative}")
+        return lines
+
+
+# Queue wait buckets in simulated seconds
+WAIT_BUCKETS = (0.0, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+REGISTRY: List[_Metric] = []
+
+SCHEDULE_SECONDS = Histogram("scheduler_schedule_seconds", "Wall time of scheduler passes", ["scheduler"])
+FIND_NODE_SECONDS = Histogram("scheduler_find_optimal_node_seconds", "Wall time of node selection per task",
+                              ["scheduler"])
+GRID_STATUS_SECONDS = Histogram("grid_status_seconds", "Wall time of GPUGrid.get_grid_status")
+REQUEST_SECONDS = Histogram("http_request_seconds", "Wall time of API requests", ["method", "route", "status"])
+PLACEMENT_FAILURES = Counter("scheduler_placement_failures", "Tasks a scheduling pass could not place")
+SIM_EVENTS = Counter("simulation_events", "SimPy events processed")
+SIM_EVENTS_RATE = Gauge("simulation_events_per_second", "SimPy events processed per wall-clock second")
+SIM_SPEED = Gauge("simulation_speed_ratio", "Simulated seconds per wall-clock second")
+SIM_TIME = Gauge("simulation_time_seconds", "Current simulated time")
+QUEUE_WAIT = Histogram("scheduler_queue_wait_seconds", "Simulated time from submission to first dispatch",
+                       ["priority"], buckets=WAIT_BUCKETS)
+PREEMPTIONS = Counter("scheduler_preemptions", "Running tasks preempted, by the victim's priority", ["priority"])
+QUEUE_DEPTH = Gauge("scheduler_queue_depth", "Pending tasks per priority", ["priority"])
+
+
+_targets: List[Tuple[type, str, Callable, Histogram]] = []
+
+
+def instrument(owner: type, name: str, histogram: Histogram):
+    """Time ``owner.name`` into ``histogram`` while metrics are enabled"""
+    fn = owner.__dict__[name]
+    _targets.append((owner, name, fn, histogram))
+    if enabled:
+        setattr(owner, name, _timed(fn, histogram))
+
+
+class instrumented:
+    """Method decorator form of ``instrument``
+    
+    The method stays the plain function until ``enable()`` is called.
+    Histograms with a ``scheduler`` label are labeled with the class name
+    of the instance.
+    """
+    
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.fn: Optional[Callable] = None
+    
+    def __call__(self, fn: Callable):
+        self.fn = fn
+        return self
+    
+    def __set_name__(self, owner: type, name: str):
+        setattr(owner, name, self.fn)
+        instrument(owner, name, self.histogram)
+
+
+def _timed(fn: Callable, histogram: Histogram) -> Callable:
+    per_class = bool(histogram.label_names)
+    perf_counter = time.perf_counter
+    
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            if per_class:
+                histogram.labels(type(self).__name__).observe(elapsed)
+            else:
+                histogram.observe(elapsed)
+    
+    return wrapper
+
+
+def enable():
+    """Start collecting: install timing wrappers on every instrumented method"""
+    global enabled
+    enabled = True
+    for owner, name, fn, histogram in _targets:
+        setattr(owner, name, _timed(fn, histogram))
+
+
+def disable():
+    """Stop collecting and restore the uninstrumented methods"""
+    global enabled
+    enabled = False
+    for owner, name, fn, _ in _targets:
+        setattr(owner, name, fn)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request by method, route template and status"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if not enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], path, status[0]).observe(time.perf_counter() - start)
+
+
+instrument(GPUGrid, "get_grid_status", GRID_STATUS_SECONDS)
@@ -26,8 +26,11 @@ class Task(BaseModel):
     task_id: str
     status: TaskStatus
     assigned_node: Optional[int] = None
+    submit_time: Optional[float] = None
     start_time: Optional[float] = None
     end_time: Optional[float] = None
+    progress: float = 0.0  # Seconds of work completed before the last preemption
+    preemptions: int = 0
     request: TaskRequest
 
 class GPUNodeStatus(BaseModel):
@@ -36,6 +39,8 @@ class GPUNodeStatus(BaseModel):
     state: str
     telemetry: Dict[str, float]
     current_task: Optional[Dict[str, Any]] = None
+    task_ids: List[str] = []
+    free_memory: float = 0.0
 
 class ClusterStatus(BaseModel):
     timestamp: float
@@ -43,4 +48,28 @@ class ClusterStatus(BaseModel):
     available_nodes: int
     total_nodes: int
     pending_tasks: int
-    running_tasks: int
\ No newline at end of file
+    running_tasks: int
+
+class BulkItemResult(BaseModel):
+    index: int
+    task_id: Optional[str] = None
+    accepted: bool
+    error: Optional[str] = None
+
+class BulkSubmitResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BulkItemResult]
+
+class TaskPage(BaseModel):
+    tasks: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    # Matches from the cursor on; only computed for count_only and unfiltered first pages
+    count: Optional[int] = None
+
+class TaskLookupRequest(BaseModel):
+    task_ids: List[str]
+
+class TaskLookupResponse(BaseModel):
+    tasks: List[Task]
+    missing: List[str]
\ No newline at end of file
@@ -0,0 +1,86 @@
+from typing import Any, Container, Dict, Optional
+
+from .models import Task, TaskPriority, TaskRequest, TaskStatus
+
+
+class TaskSpec:
+    """What a task asks for: the internal, unvalidated form of ``TaskRequest``"""
+
+    __slots__ = ("task_id", "duration", "memory_required", "priority", "metadata")
+
+    def __init__(self, task_id: str, duration: float, memory_required: float,
+                 priority: TaskPriority = TaskPriority.MEDIUM, metadata: Optional[Dict[str, Any]] = None):
+        self.task_id = task_id
+        self.duration = duration
+        self.memory_required = memory_required
+        self.priority = priority
+        self.metadata = metadata
+
+    @classmethod
+    def from_request(cls, request: TaskRequest) -> "TaskSpec":
+        return cls(request.task_id, request.duration, request.memory_required,
+                   request.priority, request.metadata)
+
+    def to_model(self) -> TaskRequest:
+        # Validated on the way in, so skip validation on the way out
+        return TaskRequest.model_construct(task_id=self.task_id, duration=self.duration,
+                                           memory_required=self.memory_required,
+                                           priority=self.priority, metadata=self.metadata)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.task_id,
+            "duration": self.duration,
+            "memory_required": self.memory_required,
+            "priority": self.priority.value,
+            "metadata": self.metadata,
+        }
+
+    def __repr__(self) -> str:
+        return f"TaskSpec({self.task_id!r}, {self.duration}s, {self.memory_required} GB, {self.priority.value})"
+
+
+class TaskRecord:
+    """Lifecycle of a task inside the control plane: the internal form of ``Task``
+
+    Schedulers, the task store and the simulation only ever see records;
+    ``to_model`` and ``as_dict`` convert them at the API boundary.
+    """
+
+    __slots__ = ("task_id", "status", "assigned_node", "submit_time", "start_time", "end_time",
+                 "progress", "preemptions", "request")
+
+    def __init__(self, request: TaskSpec, status: TaskStatus = TaskStatus.PENDING,
+                 submit_time: Optional[float] = None):
+        self.task_id = request.task_id
+        self.status = status
+        self.assigned_node: Optional[int] = None
+        self.submit_time = submit_time
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.progress = 0.0  # Seconds of work completed before the last preemption
+        self.preemptions = 0
+        self.request = request
+
+    def to_model(self) -> Task:
+        """Copy the record into a ``Task`` model"""
+        return Task.model_construct(task_id=self.task_id, status=self.status,
+                                    assigned_node=self.assigned_node, submit_time=self.submit_time,
+                                    start_time=self.start_time, end_time=self.end_time,
+                                    progress=self.progress, preemptions=self.preemptions,
+                                    request=self.request.to_model())
+
+    def as_dict(self, fields: Optional[Container[str]] = None) -> Dict[str, Any]:
+        """JSON-ready dict of the record, optionally only the given fields"""
+        return {field: self._json_value(field) for field in self.__slots__
+                if fields is None or field in fields}
+
+    def _json_value(self, field: str) -> Any:
+        if field == "status":
+            return self.status.value
+        if field == "request":
+            return self.request.as_dict()
+        return getattr(self, field)
+
+    def __repr__(self) -> str:
+        return f"TaskRecord({self.task_id!r}, {self.status.value}, node={self.assigned_node})"
@@ -1,112 +1,351 @@
-from typing import Dict, List, Optional
-from .models import Task, TaskRequest, TaskStatus
+from typing import Dict, Iterator, List, Optional
+from .models import TaskPriority, TaskStatus
+from .records import TaskRecord, TaskSpec
+from .task_store import PRIORITY_ORDER, TaskStore
+from . import metrics
 from simulation.gpu_grid import GPUGrid
+from simulation.gpu_node import GPUState, TaskFailed
+from config import Config, DEFAULT_SCHEDULER_WEIGHTS
 import simpy
 
+# Rank of each priority, 0 = most urgent
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITY_ORDER)}
+
+class Preemption:
+    """Interrupt cause of a task preempted for a higher-priority one"""
+    
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+    
+    def __repr__(self) -> str:
+        return f"preempted by {self.task_id}"
+
 class BaseScheduler:
     """Base scheduler class"""
     
-    def __init__(self, grid: GPUGrid):
+    # Dispatch pending tasks by priority (and allow preemption) rather than in arrival order
+    priority_dispatch = True
+    
+    def __init__(self, grid: GPUGrid, history_size: int = 10000, preemption: Optional[bool] = None):
         self.grid = grid
-        self.task_queue: List[Task] = []
-        self.running_tasks: Dict[str, Task] = {}
+        self.tasks = TaskStore(history_size=history_size)
+        self.process: Optional[simpy.Process] = None
+        self._wakeup: Optional[simpy.Event] = None
+        if preemption is None:
+            preemption = Config.SCHEDULER_PREEMPTION
+        self.preemption = preemption and self.priority_dispatch
+        # Queue wait (first dispatch only) and preemptions per priority
+        self.priority_stats: Dict[TaskPriority, Dict[str, float]] = {
+            priority: {"dispatched": 0, "total_wait": 0.0, "max_wait": 0.0, "preempted": 0}
+            for priority in PRIORITY_ORDER
+        }
+    
+    @property
+    def task_queue(self) -> List[TaskRecord]:
+        """Pending tasks in submission order"""
+        return list(self.tasks.pending())
+    
+    @property
+    def running_tasks(self) -> Dict[str, TaskRecord]:
+        """Running tasks keyed by task id"""
+        return self.tasks.by_status(TaskStatus.RUNNING)
     
-    def add_task(self, task_request: TaskRequest) -> Task:
+    def _new_task(self, task_spec: TaskSpec) -> TaskRecord:
+        return TaskRecord(task_spec, TaskStatus.PENDING, submit_time=self.grid.env.now)
+    
+    def add_task(self, task_spec: TaskSpec) -> TaskRecord:
         """Add a new task to the scheduler"""
-        task = Task(
-            task_id=task_request.task_id,
-            status=TaskStatus.PENDING,
-            request=task_request
-        )
-        self.task_queue.append(task)
+        task = self._new_task(task_spec)
+        self.tasks.add(task)
+        self.request_schedule()
         return task
     
-    def schedule(self) -> List[Task]:
+    def add_tasks(self, task_specs: List[TaskSpec]) -> List[Optional[str]]:
+        """Add a batch of tasks in one step
+        
+        Returns one entry per request: None if it was added, otherwise the
+        reason it was rejected. Triggers at most one scheduling pass.
+        """
+        errors: List[Optional[str]] = []
+        for task_spec in task_specs:
+            try:
+                self.tasks.add(self._new_task(task_spec))
+            except ValueError as e:
+                errors.append(str(e))
+            else:
+                errors.append(None)
+        self.request_schedule()
+        return errors
+    
+    def get_task(self, task_id: str) -> Optional[TaskRecord]:
+        """Look up a task by id"""
+        return self.tasks.get(task_id)
+    
+    def _queue(self) -> Iterator[TaskRecord]:
+        """Pending tasks in dispatch order"""
+        if self.priority_dispatch:
+            return self.tasks.pending_in_priority_order()
+        return self.tasks.pending()
+    
+    def schedule(self) -> List[TaskRecord]:
         """Schedule tasks from the queue - to be implemented by subclasses"""
         raise NotImplementedError("Subclasses must implement schedule method")
     
+    def start(self, interval: Optional[float] = None) -> simpy.Process:
+        """Run the scheduler as an event-driven SimPy process
+        
+        A pass runs whenever a task arrives or a node becomes idle (task
+        completion or throttle recovery). Triggers raised at the same
+        simulated time are coalesced into one pass, and ``interval``
+        (default ``Config.SCHEDULER_INTERVAL``) is only a fallback.
+        """
+        if self.process is None:
+            if interval is None:
+                interval = Config.SCHEDULER_INTERVAL
+            self._wakeup = self.grid.env.event()
+            self.grid.state_listeners.append(self._on_node_state_change)
+            self.process = self.grid.env.process(self._run(interval))
+        return self.process
+    
+    def request_schedule(self):
+        """Ask the scheduling process for a pass (no-op if it is not running)"""
+        if self._wakeup is not None and not self._wakeup.triggered:
+            self._wakeup.succeed()
+    
+    def _run(self, interval: float):
+        env = self.grid.env
+        while True:
+            yield self._wakeup | env.timeout(interval)
+            # Let everything else due at this instant happen before the pass
+            yield env.timeout(0)
+            self._wakeup = env.event()
+            if self.tasks.count(TaskStatus.PENDING):
+                self.schedule()
+                if self.preemption and self.tasks.count(TaskStatus.PENDING):
+                    self.preempt()
+    
+    def _on_node_state_change(self, node, old_state: GPUState, new_state: GPUState):
+        # A node recovering from throttling turns BUSY if tasks are still
+        # running on it, but its free memory is available again either way
+        if new_state == GPUState.IDLE or old_state == GPUState.THROTTLED:
+            self.request_schedule()
+    
+    def _dispatch(self, task: TaskRecord, node) -> bool:
+        """Start a task on a node and move it to the running index
+        
+        A preempted task resumes with only its remaining work.
+        """
+        request = task.request
+        node_task = {
+            "task_id": request.task_id,
+            "duration": request.duration - task.progress,
+            "memory_required": request.memory_required,
+            "priority": request.priority,
+            "metadata": request.metadata,
+        }
+        try:
+            event = self.grid.execute_task_on_node(node.node_id, node_task)
+        except Exception as e:
+            print(f"Failed to schedule task {task.task_id}: {e}")
+            if metrics.enabled:
+                metrics.PLACEMENT_FAILURES.inc()
+            return False
+        task.assigned_node = node.node_id
+        task.start_time = self.grid.env.now
+        if not task.preemptions:
+            self._record_wait(task)
+        self.tasks.set_status(task, TaskStatus.RUNNING)
+        event.callbacks.append(lambda event, task=task: self._on_task_finished(task, event))
+        return True
+    
+    def _record_wait(self, task: TaskRecord):
+        """Count the queue wait of a task's first dispatch"""
+        priority = task.request.priority
+        wait = task.start_time - task.submit_time
+        stats = self.priority_stats[priority]
+        stats["dispatched"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        if metrics.enabled:
+            metrics.QUEUE_WAIT.labels(priority.value).observe(wait)
+    
+    def _on_task_finished(self, task: TaskRecord, event: simpy.Event):
+        """Reconcile a task with its completion event"""
+        now = self.grid.env.now
+        # The task's memory is free again, possibly on a node that stays busy
+        self.request_schedule()
+        if event.ok:
+            task.end_time = now
+            self.tasks.set_status(task, TaskStatus.COMPLETED)
+            return
+        # The failure is handled here, don't let SimPy re-raise it
+        event.defused = True
+        if isinstance(event.value, TaskFailed) and isinstance(event.value.cause, Preemption):
+            # Back to the queue, keeping credit for the work already done
+            task.progress += event.value.work_done
+            task.preemptions += 1
+            self.tasks.set_status(task, TaskStatus.PENDING)
+            task.assigned_node = None
+            task.start_time = None
+            return
+        task.end_time = now
+        self.tasks.set_status(task, TaskStatus.FAILED)
+    
+    def preempt(self) -> List[TaskRecord]:
+        """Interrupt lower-priority running tasks for pending tasks that do not fit anywhere
+        
+        Pending tasks are visited by priority. A task that no available node
+        can hold takes the lowest-priority (then most recently started)
+        running task whose memory, with the node's free memory, is enough
+        for it; the victim is requeued and the memory is picked up by the
+        pass that follows its release. At most one task per node is
+        preempted per call. Returns the preempted tasks.
+        """
+        victims = []
+        for task in self.running_tasks.values():
+            node = self.grid.get_node_by_id(task.assigned_node)
+            if node is not None and node.state == GPUState.BUSY and task.task_id in node.task_processes:
+                victims.append(task)
+        if not victims:
+            return []
+        victims.sort(key=lambda task: (PRIORITY_RANK[task.request.priority], task.start_time), reverse=True)
+        preempted = []
+        draining = set()
+        for task in self._queue():
+            rank = PRIORITY_RANK[task.request.priority]
+            if not victims or rank >= PRIORITY_RANK[victims[0].request.priority]:
+                break
+            memory_required = task.request.memory_required
+            if next(self.grid.availability.buckets(memory_required), None) is not None:
+                continue
+            for index, victim in enumerate(victims):
+                if PRIORITY_RANK[victim.request.priority] <= rank:
+                    break
+                node = self.grid.get_node_by_id(victim.assigned_node)
+                if node.node_id not in draining \
+                        and node.free_memory + victim.request.memory_required >= memory_required:
+                    del victims[index]
+                    draining.add(node.node_id)
+                    node.task_processes[victim.task_id].interrupt(Preemption(task.task_id))
+                    self.priority_stats[victim.request.priority]["preempted"] += 1
+                    if metrics.enabled:
+                        metrics.PREEMPTIONS.labels(victim.request.priority.value).inc()
+                    preempted.append(victim)
+                    break
+        return preempted
+    
     def get_queue_status(self) -> Dict[str, any]:
         """Get current status of the task queue"""
         return {
-            "pending_tasks": len(self.task_queue),
-            "running_tasks": len(self.running_tasks),
-            "queued_tasks": [task.dict() for task in self.task_queue],
-            "running_tasks_info": [task.dict() for task in self.running_tasks.values()],
+            "pending_tasks": self.tasks.count(TaskStatus.PENDING),
+            "running_tasks": self.tasks.count(TaskStatus.RUNNING),
+            "pending_by_priority": self.tasks.pending_by_priority(),
+            "priority_stats": {
+                priority.value: {
+                    "dispatched": stats["dispatched"],
+                    "mean_wait": stats["total_wait"] / stats["dispatched"] if stats["dispatched"] else 0.0,
+                    "max_wait": stats["max_wait"],
+                    "preempted": stats["preempted"],
+                }
+                for priority, stats in self.priority_stats.items()
+            },
+            "queued_tasks": [task.as_dict() for task in self.tasks.pending()],
+            "running_tasks_info": [task.as_dict() for task in self.running_tasks.values()],
         }
 
 class FIFOScheduler(BaseScheduler):
     """First-In-First-Out scheduler"""
     
-    def schedule(self) -> List[Task]:
+    priority_dispatch = False
+    
+    @metrics.instrumented(metrics.SCHEDULE_SECONDS)
+    def schedule(self) -> List[TaskRecord]:
         """Schedule tasks in FIFO order"""
         scheduled = []
-        for task in self.task_queue[:]:
-            available_nodes = self.grid.get_available_nodes()
-            if available_nodes:
-                # Assign to first available node
-                node = available_nodes[0]
-                try:
-                    event = self.grid.execute_task_on_node(node.node_id, task.request.dict())
-                    task.assigned_node = node.node_id
-                    task.status = TaskStatus.RUNNING
-                    self.running_tasks[task.task_id] = task
-                    self.task_queue.remove(task)
-                    scheduled.append(task)
-                except Exception as e:
-                    print(f"Failed to schedule task {task.task_id}: {e}")
+        for task in self.tasks.pending():
+            # Assign to the first node with room; a task that fits nowhere blocks the queue
+            node = self.grid.availability.first(task.request.memory_required)
+            if node is None:
+                break
+            if self._dispatch(task, node):
+                scheduled.append(task)
         return scheduled
 
 class IntelligentScheduler(BaseScheduler):
     """Intelligent scheduler that considers telemetry data"""
     
-    def schedule(self) -> List[Task]:
+    def __init__(self, grid: GPUGrid, history_size: int = 10000, preemption: Optional[bool] = None):
+        super().__init__(grid, history_size=history_size, preemption=preemption)
+        # Score weights; a partial override keeps the defaults of the keys it leaves out
+        weights = {**DEFAULT_SCHEDULER_WEIGHTS, **Config.SCHEDULER_WEIGHTS}
+        self.temperature_weight = weights["temperature"]
+        self.memory_weight = weights["memory"]
+        self.utilization_weight = weights["utilization"]
+        self.packing_weight = weights["packing"]
+        self.thermal_weight = weights["thermal"]
+        # Order each availability bucket by the task-independent part of the score
+        self.grid.availability.set_key(lambda node: -self._node_score(node))
+    
+    @metrics.instrumented(metrics.SCHEDULE_SECONDS)
+    def schedule(self) -> List[TaskRecord]:
         """Schedule tasks based on telemetry and resource awareness"""
         scheduled = []
-        for task in self.task_queue[:]:
+        for task in self._queue():
             best_node = self._find_optimal_node(task)
-            if best_node:
-                try:
-                    event = self.grid.execute_task_on_node(best_node.node_id, task.request.dict())
-                    task.assigned_node = best_node.node_id
-                    task.status = TaskStatus.RUNNING
-                    self.running_tasks[task.task_id] = task
-                    self.task_queue.remove(task)
-                    scheduled.append(task)
-                except Exception as e:
-                    print(f"Failed to schedule task {task.task_id}: {e}")
+            if best_node is None:
+                if metrics.enabled:
+                    metrics.PLACEMENT_FAILURES.inc()
+                if not len(self.grid.availability):
+                    break
+                continue
+            if self._dispatch(task, best_node):
+                scheduled.append(task)
         return scheduled
     
-    def _find_optimal_node(self, task: Task) -> Optional[any]:
+    @metrics.instrumented(metrics.FIND_NODE_SECONDS)
+    def _find_optimal_node(self, task: TaskRecord) -> Optional[any]:
         """Find the best node for a task based on telemetry and requirements"""
-        available_nodes = self.grid.get_available_nodes()
-        if not available_nodes:
-            return None
-        
-        # Score nodes based on multiple factors
-        scored_nodes = []
-        for node in available_nodes:
+        # Only the best node of each bucket the task fits in needs a full score
+        best_node, best_score = None, float("-inf")
+        for node in self.grid.availability.candidates(task.request.memory_required):
             score = self._calculate_node_score(node, task)
-            scored_nodes.append((score, node))
-        
-        # Return node with highest score
-        scored_nodes.sort(key=lambda x: x[0], reverse=True)
-        return scored_nodes[0][1] if scored_nodes else None
+            if score > best_score:
+                best_node, best_score = node, score
+        return best_node
     
-    def _calculate_node_score(self, node, task: Task) -> float:
-        """Calculate a score for a node based on multiple factors"""
+    def _node_score(self, node) -> float:
+        """Score the task-independent factors of a node"""
         score = 0.0
         
         # Prefer cooler nodes
         temperature = node.telemetry.temperature
-        score += (85 - temperature) / 85 * 0.4  # 40% weight to temperature
-        
-        # Prefer nodes with appropriate memory
-        memory_required = task.request.memory_required
-        # This is simplified - in real implementation we'd check actual memory capacity
-        score += 0.3  # 30% base score for memory suitability
+        score += (85 - temperature) / 85 * self.temperature_weight
         
         # Prefer nodes with lower current utilization
         utilization = node.telemetry.utilization
-        score += (100 - utilization) / 100 * 0.3  # 30% weight to utilization
+        score += (100 - utilization) / 100 * self.utilization_weight
+        
+        return score
+    
+    def _calculate_node_score(self, node, task: TaskRecord) -> float:
+        """Calculate a score for a node based on multiple factors"""
+        # Nodes without enough free memory cannot run the task at all
+        memory_required = task.request.memory_required
+        free_memory = node.free_memory
+        if memory_required > free_memory:
+            return float("-inf")
+        
+        score = self._node_score(node)
+        
+        # Prefer tight memory fits so large GPUs stay free for large tasks
+        score += memory_required / free_memory * self.memory_weight
+        
+        # Best fit: prefer the node left fullest, packing tasks onto shared GPUs
+        score += (1 - (free_memory - memory_required) / node.memory_gb) * self.packing_weight
+        
+        # Lookahead: avoid nodes projected to throttle (and slow down) before the task ends
+        if self.thermal_weight:
+            duration = task.request.duration - task.progress
+            score -= node.projected_throttle(duration, memory_required) * self.thermal_weight
         
         return score
\ No newline at end of file
@@ -0,0 +1,320 @@
+import multiprocessing
+import os
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from config import Config
+from .models import TaskStatus
+from .records import TaskRecord, TaskSpec
+from .scheduler import BaseScheduler, IntelligentScheduler
+
+# (task_id, status, global node id, start_time, end_time) as reported by a shard
+Transition = Tuple[str, str, Optional[int], Optional[float], Optional[float]]
+
+
+@dataclass
+class ShardSummary:
+    """Compact capacity summary a shard reports after every step"""
+    shard_id: int
+    node_offset: int
+    total_nodes: int
+    available_nodes: int = 0
+    pending_tasks: int = 0
+    running_tasks: int = 0
+    # Available nodes by free memory (GB)
+    free_memory: Dict[float, int] = field(default_factory=dict)
+    # All nodes by memory size (GB), fixed for the shard's lifetime
+    memory: Dict[float, int] = field(default_factory=dict)
+    
+    def fitting(self, memory_required: float) -> int:
+        """Number of available nodes with at least ``memory_required`` GB free"""
+        return sum(count for memory, count in self.free_memory.items() if memory >= memory_required)
+    
+    def can_host(self, memory_required: float) -> bool:
+        """Whether any node of the shard is large enough, busy or not"""
+        return any(memory >= memory_required for memory in self.memory)
+
+
+def _shard_main(conn, config: Dict[str, Any], shard_id: int, node_offset: int, num_nodes: int,
+                scheduler_class: Type[BaseScheduler], seed: Optional[int],
+                vectorized_telemetry: Optional[bool]):
+    """Worker process: one environment, one grid slice and its local scheduler
+    
+    ``config`` is the coordinator's ``Config.to_dict()``: a spawned worker
+    imports ``config`` afresh and would otherwise miss any overrides the
+    coordinator loaded.
+    """
+    import simpy
+    from config import Config
+    from simulation.gpu_grid import GPUGrid
+
+    for key, value in config.items():
+        setattr(Config, key, value)
+    # History is per process and not reachable through the coordinator
+    Config.TELEMETRY_HISTORY = False
+    env = simpy.Environment()
+    grid = GPUGrid(env, num_nodes, vectorized_telemetry=vectorized_telemetry, seed=seed)
+    scheduler = scheduler_class(grid)
+    scheduler.start()
+    memory = dict(Counter(node.memory_gb for node in grid.nodes))
+    transitions: List[Transition] = []
+
+    def on_transition(task: TaskRecord, old_status: Optional[TaskStatus], new_status: TaskStatus):
+        if old_status is not None:
+            node = task.assigned_node + node_offset if task.assigned_node is not None else None
+            transitions.append((task.task_id, new_status.value, node, task.start_time, task.end_time))
+
+    def summary() -> ShardSummary:
+        free_memory: Dict[float, int] = {}
+        for (_, free), count in grid.availability.counts().items():
+            free_memory[free] = free_memory.get(free, 0) + count
+        return ShardSummary(
+            shard_id=shard_id,
+            node_offset=node_offset,
+            total_nodes=num_nodes,
+            available_nodes=len(grid.availability),
+            pending_tasks=scheduler.tasks.count(TaskStatus.PENDING),
+            running_tasks=scheduler.tasks.count(TaskStatus.RUNNING),
+            free_memory=free_memory,
+            memory=memory,
+        )
+
+    def node_statuses() -> List[Dict[str, Any]]:
+        statuses = grid.get_grid_status()["nodes"]
+        for status in statuses:
+            status["node_id"] += node_offset
+        return statuses
+
+    scheduler.tasks.listeners.append(on_transition)
+    conn.send(("ok", summary()))
+    while True:
+        command = conn.recv()
+        try:
+            if command[0] == "step":
+                _, until, specs = command
+                if specs:
+                    scheduler.add_tasks(specs)
+                env.run(until=until)
+                conn.send(("ok", (summary(), transitions)))
+                transitions = []
+            elif command[0] == "nodes":
+                conn.send(("ok", node_statuses()))
+            elif command[0] == "stop":
+                conn.send(("ok", None))
+                break
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+class ShardClock:
+    """Stand-in for ``simpy.Environment`` that advances all shards together"""
+    
+    def __init__(self, grid: "ShardedGrid"):
+        self.grid = grid
+        self.now = 0.0
+    
+    def run(self, until: float):
+        self.grid.advance(until)
+
+
+class ShardedGrid:
+    """GPU grid partitioned across worker processes
+    
+    Every shard runs its own SimPy environment, GPUGrid slice and local
+    scheduler (``scheduler_class``) in a separate process. The coordinator
+    advances all shards in lockstep: each ``advance`` sends the tasks routed
+    since the last step together with the target time, and the shards run
+    in parallel until it. Nodes keep globally unique ids (shard offset +
+    local id), so the shards read as one logical cluster. Shards run with
+    the coordinator's ``Config`` as it was when the grid was built.
+    
+    Cluster counters come from the shard summaries of every step. Per-node
+    status is only gathered from the shards every ``node_refresh``
+    simulated seconds (default ``Config.SHARD_NODE_REFRESH``), since
+    pickling and re-encoding every node each step cannot keep up with
+    100k+ nodes.
+    """
+    
+    def __init__(self, num_nodes: int, num_shards: Optional[int] = None,
+                 scheduler_class: Type[BaseScheduler] = IntelligentScheduler,
+                 vectorized_telemetry: Optional[bool] = None, seed: Optional[int] = None,
+                 start_method: str = "spawn", node_refresh: Optional[float] = None):
+        if num_shards is None:
+            num_shards = os.cpu_count() or 1
+        num_shards = max(1, min(num_shards, num_nodes))
+        self.env = ShardClock(self)
+        self.total_nodes = num_nodes
+        # Telemetry history lives in the shards' processes and is not exposed
+        self.telemetry_history = None
+        # Called as listener(transitions) with every step's task transitions
+        self.transition_listeners: List[Callable[[List[Transition]], None]] = []
+        self.node_refresh = Config.SHARD_NODE_REFRESH if node_refresh is None else node_refresh
+        self._nodes: List[Dict[str, Any]] = []
+        self._nodes_time: Optional[float] = None
+        context = multiprocessing.get_context(start_method)
+        config = Config.to_dict()
+        self._connections = []
+        self._processes = []
+        offset = 0
+        for shard_id in range(num_shards):
+            size = num_nodes // num_shards + (1 if shard_id < num_nodes % num_shards else 0)
+            parent, child = context.Pipe()
+            shard_seed = None if seed is None else seed + shard_id
+            process = context.Process(
+                target=_shard_main,
+                args=(child, config, shard_id, offset, size, scheduler_class, shard_seed, vectorized_telemetry),
+                name=f"grid-shard-{shard_id}",
+                daemon=True,
+            )
+            process.start()
+            self._connections.append(parent)
+            self._processes.append(process)
+            offset += size
+        self.summaries: List[ShardSummary] = self._gather()
+        self._outbox: List[List[TaskSpec]] = [[] for _ in range(num_shards)]
+    
+    def __enter__(self) -> "ShardedGrid":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _broadcast(self, make_command: Callable[[int], tuple]) -> List[Any]:
+        for shard_id, conn in enumerate(self._connections):
+            conn.send(make_command(shard_id))
+        return self._gather()
+    
+    def _gather(self) -> List[Any]:
+        results = []
+        for shard_id, conn in enumerate(self._connections):
+            status, payload = conn.recv()
+            if status == "error":
+                raise RuntimeError(f"Shard {shard_id} failed:\n{payload}")
+            results.append(payload)
+        return results
+    
+    def route(self, task_spec: TaskSpec) -> int:
+        """Pick the shard for a task from the capacity summaries
+        
+        Prefers the shard with the most free nodes that fit the task, net
+        of the tasks already queued or routed there since the last step.
+        Returns the shard id; the task is sent with the next step.
+        """
+        memory_required = task_spec.memory_required
+        best_shard, best_score = 0, None
+        for summary in self.summaries:
+            if not summary.can_host(memory_required):
+                continue
+            backlog = summary.pending_tasks + len(self._outbox[summary.shard_id])
+            score = summary.fitting(memory_required) - backlog
+            if best_score is None or score > best_score:
+                best_shard, best_score = summary.shard_id, score
+        self._outbox[best_shard].append(task_spec)
+        return best_shard
+    
+    def advance(self, until: float):
+        """Run every shard until ``until`` and collect summaries and transitions"""
+        outbox, self._outbox = self._outbox, [[] for _ in self._connections]
+        results = self._broadcast(lambda shard_id: ("step", until, outbox[shard_id]))
+        self.env.now = until
+        transitions: List[Transition] = []
+        self.summaries = []
+        for summary, shard_transitions in results:
+            self.summaries.append(summary)
+            transitions.extend(shard_transitions)
+        for listener in self.transition_listeners:
+            listener(transitions)
+    
+    def node_statuses(self) -> List[Dict[str, Any]]:
+        """Current status of every node, gathered from all shards"""
+        nodes = []
+        for shard_nodes in self._broadcast(lambda shard_id: ("nodes",)):
+            nodes.extend(shard_nodes)
+        return nodes
+    
+    def get_grid_status(self) -> Dict[str, Any]:
+        """Status of the cluster, with per-node status refreshed every ``node_refresh`` seconds
+        
+        Between refreshes ``nodes`` is the same list object, so callers can
+        tell it has not changed without comparing it.
+        """
+        if self._nodes_time is None or self.env.now - self._nodes_time >= self.node_refresh:
+            self._nodes = self.node_statuses()
+            self._nodes_time = self.env.now
+        return {
+            "timestamp": self.env.now,
+            "nodes": self._nodes,
+            "available_nodes": sum(summary.available_nodes for summary in self.summaries),
+            "total_nodes": self.total_nodes,
+        }
+    
+    def get_node_by_id(self, node_id: int) -> None:
+        """Nodes live in the shard processes and cannot be returned"""
+        return None
+    
+    def close(self):
+        """Stop all shard processes"""
+        if not self._processes:
+            return
+        for conn in self._connections:
+            conn.send(("stop",))
+        for conn, process in zip(self._connections, self._processes):
+            conn.recv()
+            process.join(5)
+        self._processes = []
+
+
+class ShardedScheduler(BaseScheduler):
+    """Coordinator level of the two-level scheduler for a ``ShardedGrid``
+    
+    Tasks are registered here (so lookups and queries see one cluster) and
+    routed to a shard; the shard's local scheduler places them on nodes.
+    The task store is kept in sync from the transitions shards report
+    after each step.
+    """
+    
+    def __init__(self, grid: ShardedGrid, history_size: int = 10000):
+        super().__init__(grid, history_size=history_size)
+        grid.transition_listeners.append(self._apply_transitions)
+    
+    def add_task(self, task_spec: TaskSpec) -> TaskRecord:
+        """Register a task and route it to a shard"""
+        task = super().add_task(task_spec)
+        self.grid.route(task_spec)
+        return task
+    
+    def add_tasks(self, task_specs: List[TaskSpec]) -> List[Optional[str]]:
+        """Register a batch of tasks and route the accepted ones"""
+        errors = super().add_tasks(task_specs)
+        for task_spec, error in zip(task_specs, errors):
+            if error is None:
+                self.grid.route(task_spec)
+        return errors
+    
+    def start(self, interval: Optional[float] = None) -> None:
+        """Placement runs inside the shards, there is no coordinator process"""
+        return None
+    
+    def schedule(self) -> List[TaskRecord]:
+        """Placement runs inside the shards on every step"""
+        return []
+    
+    def _apply_transitions(self, transitions: List[Transition]):
+        for task_id, status, node, start_time, end_time in transitions:
+            task = self.tasks.get(task_id)
+            if task is None or task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                continue
+            task.assigned_node = node
+            task.start_time = start_time
+            task.end_time = end_time
+            status = TaskStatus(status)
+            if status != task.status:
+                self.tasks.set_status(task, status)
+    
+    def get_queue_status(self) -> Dict[str, any]:
+        """Queue status plus the latest shard summaries"""
+        status = super().get_queue_status()
+        status["shards"] = [summary.__dict__ for summary in self.grid.summaries]
+        return status
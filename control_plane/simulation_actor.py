@@ -0,0 +1,248 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import simpy
+
+from config import Config
+from . import metrics
+from .models import TaskStatus
+from .records import TaskRecord
+from .scheduler import BaseScheduler
+from .streaming import StreamHub, StreamMessage, delta_event, keyframe_event, node_deltas, tasks_event
+from simulation.gpu_grid import GPUGrid
+
+
+@dataclass(frozen=True)
+class ClusterSnapshot:
+    """Consistent, read-only view of the cluster taken between simulation steps
+    
+    ``status_body`` and ``nodes_body`` are the JSON bodies of
+    ``GET /cluster/status`` and ``GET /nodes``, encoded once when the
+    snapshot is published. ``version`` only moves when their content changes.
+    """
+    version: int
+    timestamp: float
+    status: Dict[str, Any]
+    status_body: bytes
+    nodes_body: bytes
+    
+    @property
+    def etag(self) -> str:
+        return f'"{_BOOT_ID}-{self.version}"'
+
+
+# Distinguishes ETags of different server runs
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class SimulationActor:
+    """Single owner of the SimPy environment, grid and scheduler
+    
+    The simulation runs in one dedicated thread with its own asyncio loop.
+    Other threads never touch the environment directly: they send commands
+    through an asyncio queue (``call``/``submit``) that the actor applies
+    between steps, and read the latest ``snapshot`` published after each
+    step. The actor paces simulated time to ``speed`` simulated seconds per
+    wall-clock second, or runs as fast as possible when ``speed <= 0``,
+    waiting on the command queue instead of spinning.
+    """
+    
+    def __init__(self, env: simpy.Environment, grid: GPUGrid, scheduler: BaseScheduler,
+                 speed: Optional[float] = None, step: float = 1.0):
+        self.env = env
+        self.grid = grid
+        self.scheduler = scheduler
+        self.speed = Config.SIMULATION_SPEED if speed is None else speed
+        self.step = step
+        self.stream = StreamHub()
+        self.keyframe_interval = Config.STREAM_KEYFRAME_INTERVAL
+        self._transitions: List[Dict[str, Any]] = []
+        self.scheduler.tasks.listeners.append(self._on_task_transition)
+        self.snapshot: Optional[ClusterSnapshot] = None
+        self._publish()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._commands: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._running = False
+    
+    def start(self):
+        """Start the actor thread and wait until it accepts commands"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._thread_main, name="simulation-actor", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the actor after its current step"""
+        if self._thread is None:
+            return
+        self._running = False
+        self._loop.call_soon_threadsafe(self._commands.put_nowait, None)
+        self._thread.join(timeout)
+        self._thread = None
+    
+    def call(self, fn: Callable, *args) -> concurrent.futures.Future:
+        """Run ``fn(*args)`` on the actor thread and return a future for its result"""
+        future = concurrent.futures.Future()
+        if self._thread is None:
+            # Not started: nothing else owns the environment, apply directly
+            self._apply((fn, args, future))
+        else:
+            self._loop.call_soon_threadsafe(self._commands.put_nowait, (fn, args, future))
+        return future
+    
+    async def submit(self, fn: Callable, *args) -> Any:
+        """Awaitable version of ``call`` for asyncio callers"""
+        return await asyncio.wrap_future(self.call(fn, *args))
+    
+    def _thread_main(self):
+        asyncio.run(self._main())
+    
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._commands = asyncio.Queue()
+        self._ready.set()
+        self.scheduler.start()
+        deadline = self._loop.time()
+        while self._running:
+            self._drain()
+            if metrics.enabled and isinstance(self.env, simpy.Environment):
+                self._run_measured()
+            else:
+                self.env.run(until=self.env.now + self.step)
+            self._publish()
+            if self.speed > 0:
+                deadline += self.step / self.speed
+                if self._loop.time() > deadline + 1.0:
+                    # Fell behind (e.g. a slow step), don't try to catch up in a burst
+                    deadline = self._loop.time()
+                await self._wait_for_commands(deadline)
+            else:
+                # As fast as possible, but let commands in between steps
+                await asyncio.sleep(0)
+    
+    def _run_measured(self):
+        """Advance one step while counting SimPy events and simulated vs wall time"""
+        env = self.env
+        step = env.step
+        events = 0
+        
+        def counting_step():
+            nonlocal events
+            events += 1
+            step()
+        
+        env.step = counting_step
+        sim_start, wall_start = env.now, time.perf_counter()
+        try:
+            env.run(until=env.now + self.step)
+        finally:
+            del env.step
+        elapsed = max(time.perf_counter() - wall_start, 1e-9)
+        metrics.SIM_EVENTS.inc(events)
+        metrics.SIM_EVENTS_RATE.set(events / elapsed)
+        metrics.SIM_SPEED.set((env.now - sim_start) / elapsed)
+        metrics.SIM_TIME.set(env.now)
+        for priority, depth in self.scheduler.tasks.pending_by_priority().items():
+            metrics.QUEUE_DEPTH.labels(priority).set(depth)
+    
+    async def _wait_for_commands(self, deadline: float):
+        """Apply commands as they arrive until the next step is due"""
+        while self._running:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                return
+            try:
+                command = await asyncio.wait_for(self._commands.get(), timeout)
+            except asyncio.TimeoutError:
+                return
+            self._apply(command)
+    
+    def _drain(self):
+        while not self._commands.empty():
+            self._apply(self._commands.get_nowait())
+    
+    def _apply(self, command):
+        if command is None:
+            return
+        fn, args, future = command
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+    
+    def _on_task_transition(self, task: TaskRecord, old_status: Optional[TaskStatus], new_status: TaskStatus):
+        if len(self.stream):
+            self._transitions.append({
+                "task_id": task.task_id,
+                "status": new_status.value,
+                "assigned_node": task.assigned_node,
+            })
+    
+    def _publish(self):
+        """Publish a snapshot of the current state, pre-encoded for the status endpoints
+        
+        A grid that returns the same ``nodes`` list as last time (a sharded
+        grid between node refreshes) has its encoded nodes reused.
+        """
+        status = self.grid.get_grid_status()
+        status["pending_tasks"] = self.scheduler.tasks.count(TaskStatus.PENDING)
+        status["running_tasks"] = self.scheduler.tasks.count(TaskStatus.RUNNING)
+        previous = self.snapshot
+        nodes = status["nodes"]
+        if previous is not None and nodes is previous.status["nodes"]:
+            nodes_body = previous.nodes_body
+        else:
+            nodes_body = _encode(nodes)
+        counters = _encode({key: value for key, value in status.items() if key != "nodes"})
+        status_body = counters[:-1] + b',"nodes":' + nodes_body + b"}"
+        if previous is not None and previous.status_body == status_body and not self._transitions:
+            return
+        self.snapshot = ClusterSnapshot(
+            version=previous.version + 1 if previous else 0,
+            timestamp=self.env.now,
+            status=status,
+            status_body=status_body,
+            nodes_body=nodes_body,
+        )
+        if previous is not None and len(self.stream):
+            self._publish_stream(previous, self.snapshot)
+        self._transitions = []
+    
+    def _publish_stream(self, previous: ClusterSnapshot, snapshot: ClusterSnapshot):
+        """Encode this tick's delta (and keyframe) once for all stream subscribers"""
+        delta = None
+        keyframe = keyframe_event(snapshot.version, snapshot.status_body)
+        if self._transitions:
+            keyframe += tasks_event(snapshot.version, self._transitions)
+        if snapshot.version % self.keyframe_interval:
+            status = snapshot.status
+            delta = delta_event(snapshot.version, {
+                "timestamp": status["timestamp"],
+                "available_nodes": status["available_nodes"],
+                "pending_tasks": status["pending_tasks"],
+                "running_tasks": status["running_tasks"],
+                "nodes": node_deltas(previous.status["nodes"], status["nodes"]),
+                "tasks": self._transitions,
+            })
+        self.stream.publish(StreamMessage(
+            base_version=previous.version,
+            version=snapshot.version,
+            delta=delta,
+            keyframe=keyframe,
+        ))
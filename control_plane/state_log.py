@@ -0,0 +1,295 @@
+import mmap
+import os
+import pickle
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from .models import TaskPriority, TaskStatus
+from .records import TaskRecord, TaskSpec
+from .scheduler import BaseScheduler
+
+SNAPSHOT_FILE = "state.snapshot"
+LOG_FILE = "state.log"
+SNAPSHOT_VERSION = 1
+
+# Log frames are a 4-byte little-endian length followed by a pickled list of records
+_FRAME_HEADER = struct.Struct("<I")
+
+# Log records, all starting with (lsn, kind, time):
+#   add      task_id, duration, memory_required, priority, metadata, submit_time
+#   run      task_id, node, start_time
+#   done     task_id, status, end_time
+#   requeue  task_id, progress, preemptions
+Record = Tuple[Any, ...]
+
+
+@dataclass
+class RecoveredState:
+    """State read back from a state directory, before it is applied to a scheduler"""
+    time: float = 0.0
+    lsn: int = 0
+    nodes: List[Tuple[str, float, str]] = field(default_factory=list)
+    tasks: List[tuple] = field(default_factory=list)
+    history: List[str] = field(default_factory=list)
+    priority_stats: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    records: List[Record] = field(default_factory=list)
+
+    @property
+    def gpu_types(self) -> Optional[List[str]]:
+        """GPU type of every node, to rebuild the same grid"""
+        return [gpu_type for gpu_type, _, _ in self.nodes] or None
+
+
+def _pack_task(task: TaskRecord) -> tuple:
+    request = task.request
+    return (task.task_id, task.status.value, task.assigned_node, task.submit_time, task.start_time,
+            task.end_time, task.progress, task.preemptions, request.duration,
+            request.memory_required, request.priority.value, request.metadata)
+
+
+def _unpack_task(packed: tuple) -> TaskRecord:
+    task_id, status, assigned_node, submit_time, start_time, end_time, progress, preemptions, \
+        duration, memory_required, priority, metadata = packed
+    task = TaskRecord(TaskSpec(task_id, duration, memory_required, TaskPriority(priority), metadata),
+                      TaskStatus(status), submit_time)
+    task.assigned_node = assigned_node
+    task.start_time = start_time
+    task.end_time = end_time
+    task.progress = progress
+    task.preemptions = preemptions
+    return task
+
+
+def _read_frames(path: str) -> Iterator[List[Record]]:
+    """Record batches of a log file, stopping at a torn final frame"""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _FRAME_HEADER.size <= len(data):
+        (length,) = _FRAME_HEADER.unpack_from(data, offset)
+        offset += _FRAME_HEADER.size
+        if offset + length > len(data):
+            break
+        yield pickle.loads(data[offset:offset + length])
+        offset += length
+
+
+class StateLog:
+    """Write-ahead log and snapshots of a scheduler and its grid
+
+    Every task transition (add, run, done, requeue) is appended to an
+    in-memory batch that is written to ``state.log`` as one frame every
+    ``flush_interval`` simulated seconds, so submitting a task only costs a
+    tuple append. Every ``snapshot_interval`` simulated seconds, or once
+    the log holds ``snapshot_records`` records, the full state (tasks,
+    queue-wait statistics, node types and temperatures, simulated time) is
+    written as a compact pickle and the log is truncated. Recovery maps
+    the snapshot into memory and replays only the log records after it, so
+    restart time depends on the live state and the log tail, not on how
+    long the cluster has run.
+
+    The simulation itself is not persisted: tasks that were running when
+    the process stopped go back to the queue with the progress recorded at
+    their last preemption, and nodes come back idle (or throttled) at
+    their last temperature.
+    """
+
+    def __init__(self, directory: str, flush_interval: Optional[float] = None,
+                 snapshot_interval: Optional[float] = None, snapshot_records: Optional[int] = None,
+                 fsync: Optional[bool] = None):
+        self.directory = directory
+        self.flush_interval = Config.STATE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.snapshot_interval = Config.STATE_SNAPSHOT_INTERVAL if snapshot_interval is None else snapshot_interval
+        self.snapshot_records = Config.STATE_SNAPSHOT_RECORDS if snapshot_records is None else snapshot_records
+        self.fsync = Config.STATE_FSYNC if fsync is None else fsync
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.scheduler: Optional[BaseScheduler] = None
+        self.lsn = 0
+        self._batch: List[Record] = []
+        self._logged = 0  # Records in the log since the last snapshot
+        self._last_snapshot = 0.0
+        self._log = None
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self, num_nodes: Optional[int] = None) -> Optional[RecoveredState]:
+        """Read the latest snapshot and the log tail, or None if the directory is empty
+        
+        If ``num_nodes`` is given and the saved grid has a different size,
+        the node states are dropped with a warning and a fresh grid is
+        built; tasks, history and the clock are still recovered.
+        """
+        state = None
+        if os.path.exists(self.snapshot_path) and os.path.getsize(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                snapshot = pickle.loads(mapped)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}")
+            state = RecoveredState(time=snapshot["time"], lsn=snapshot["lsn"], nodes=snapshot["nodes"],
+                                   tasks=snapshot["tasks"], history=snapshot["history"],
+                                   priority_stats=snapshot["priority_stats"])
+        if os.path.exists(self.log_path):
+            lsn = state.lsn if state else 0
+            records = [record for batch in _read_frames(self.log_path) for record in batch if record[0] > lsn]
+            if records:
+                state = state or RecoveredState()
+                state.records = records
+                state.time = max(state.time, records[-1][2])
+        if state is not None and num_nodes is not None and state.nodes and len(state.nodes) != num_nodes:
+            print(f"State in {self.directory} has {len(state.nodes)} nodes but {num_nodes} are configured, "
+                  f"starting a fresh grid")
+            state.nodes = []
+        return state
+
+    def attach(self, scheduler: BaseScheduler, recovered: Optional[RecoveredState] = None):
+        """Apply recovered state to a new scheduler and grid, then log their changes
+
+        The grid must have been built with ``recovered.gpu_types`` in an
+        environment starting at ``recovered.time``. Writes a fresh snapshot
+        right away, so the replayed log tail is never replayed again.
+        """
+        self.scheduler = scheduler
+        if recovered is not None:
+            self._restore(recovered)
+            self.lsn = max([recovered.lsn] + [record[0] for record in recovered.records])
+        scheduler.tasks.listeners.append(self._on_transition)
+        self.snapshot()
+        scheduler.grid.env.process(self._run())
+
+    def _restore(self, state: RecoveredState):
+        scheduler = self.scheduler
+        tasks = scheduler.tasks
+        if state.nodes:
+            scheduler.grid.restore_node_states(state.nodes)
+        for priority, stats in state.priority_stats.items():
+            scheduler.priority_stats[TaskPriority(priority)].update(stats)
+        # Re-add in submission order, then finish in completion order
+        finished = {}
+        for packed in state.tasks:
+            task = _unpack_task(packed)
+            status, task.status = task.status, TaskStatus.PENDING
+            tasks.add(task)
+            if status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                finished[task.task_id] = (task, status)
+            elif status != TaskStatus.PENDING:
+                tasks.set_status(task, status)
+        for task_id in state.history:
+            if task_id in finished:
+                task, status = finished[task_id]
+                tasks.set_status(task, status)
+        for record in state.records:
+            self._replay(record)
+        # Running tasks were lost with the simulation: queue them again
+        for status in (TaskStatus.SCHEDULED, TaskStatus.RUNNING):
+            for task in list(tasks.by_status(status).values()):
+                task.assigned_node = None
+                task.start_time = None
+                tasks.set_status(task, TaskStatus.PENDING)
+
+    def _replay(self, record: Record):
+        scheduler = self.scheduler
+        _, kind, _, task_id, *args = record
+        if kind == "add":
+            duration, memory_required, priority, metadata, submit_time = args
+            if task_id not in scheduler.tasks:
+                spec = TaskSpec(task_id, duration, memory_required, TaskPriority(priority), metadata)
+                scheduler.tasks.add(TaskRecord(spec, TaskStatus.PENDING, submit_time))
+            return
+        task = scheduler.tasks.get(task_id)
+        if task is None or task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            return
+        if kind == "run":
+            task.assigned_node, task.start_time = args
+            if not task.preemptions:
+                scheduler._record_wait(task)
+            scheduler.tasks.set_status(task, TaskStatus.RUNNING)
+        elif kind == "done":
+            status, task.end_time = args
+            scheduler.tasks.set_status(task, TaskStatus(status))
+        elif kind == "requeue":
+            task.progress, task.preemptions = args
+            scheduler.priority_stats[task.request.priority]["preempted"] += 1
+            task.assigned_node = None
+            task.start_time = None
+            scheduler.tasks.set_status(task, TaskStatus.PENDING)
+
+    def _on_transition(self, task: TaskRecord, old_status: Optional[TaskStatus], new_status: TaskStatus):
+        if old_status is None:
+            request = task.request
+            kind, args = "add", (request.duration, request.memory_required, request.priority.value,
+                                 request.metadata, task.submit_time)
+        elif new_status == TaskStatus.RUNNING:
+            kind, args = "run", (task.assigned_node, task.start_time)
+        elif new_status == TaskStatus.PENDING:
+            kind, args = "requeue", (task.progress, task.preemptions)
+        elif new_status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            kind, args = "done", (new_status.value, task.end_time)
+        else:
+            return
+        self.lsn += 1
+        self._batch.append((self.lsn, kind, self.scheduler.grid.env.now, task.task_id) + args)
+
+    def _run(self):
+        env = self.scheduler.grid.env
+        while True:
+            yield env.timeout(self.flush_interval)
+            self.flush()
+            if env.now - self._last_snapshot >= self.snapshot_interval or self._logged >= self.snapshot_records:
+                self.snapshot()
+
+    def flush(self):
+        """Append the pending batch of records to the log as one frame"""
+        if not self._batch:
+            return
+        payload = pickle.dumps(self._batch, protocol=pickle.HIGHEST_PROTOCOL)
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(_FRAME_HEADER.pack(len(payload)) + payload)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._logged += len(self._batch)
+        self._batch = []
+
+    def snapshot(self):
+        """Write the full state atomically and start a new, empty log"""
+        scheduler = self.scheduler
+        self.flush()
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "time": scheduler.grid.env.now,
+            "lsn": self.lsn,
+            "nodes": scheduler.grid.node_states(),
+            "tasks": [_pack_task(task) for task in scheduler.tasks.records()],
+            "history": [task.task_id for task in scheduler.tasks.history()],
+            "priority_stats": {priority.value: dict(stats) for priority, stats in scheduler.priority_stats.items()},
+        }
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        # Records up to the snapshot's lsn are skipped on recovery, so a
+        # crash before the truncation below is harmless
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "wb")
+        self._logged = 0
+        self._last_snapshot = scheduler.grid.env.now
+
+    def close(self):
+        """Write a final snapshot and close the log
+        
+        The snapshot records the current simulated time, so a restart
+        resumes from it even if nothing was logged since the last flush.
+        """
+        if self.scheduler is None:
+            return
+        self.snapshot()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
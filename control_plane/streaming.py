@@ -0,0 +1,111 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bounded backlog per subscriber; a subscriber that falls further behind is resynced with a keyframe
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class StreamMessage:
+    """One published tick, encoded once for every subscriber"""
+    base_version: Optional[int]
+    version: int
+    delta: Optional[bytes]
+    keyframe: bytes
+
+
+def keyframe_event(version: int, status_body: bytes) -> bytes:
+    """SSE event carrying the full cluster status"""
+    return b"id: %d\nevent: keyframe\ndata: " % version + status_body + b"\n\n"
+
+
+def delta_event(version: int, delta: Dict[str, Any]) -> bytes:
+    """SSE event carrying only what changed since the previous version"""
+    data = json.dumps(delta, separators=(",", ":")).encode()
+    return b"id: %d\nevent: delta\ndata: " % version + data + b"\n\n"
+
+
+def tasks_event(version: int, transitions: List[Dict[str, Any]]) -> bytes:
+    """SSE event carrying task state transitions of a keyframe tick"""
+    data = json.dumps(transitions, separators=(",", ":")).encode()
+    return b"id: %d\nevent: tasks\ndata: " % version + data + b"\n\n"
+
+
+def node_deltas(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Changed fields per node between two lists of ``GPUNode.get_status()`` dicts"""
+    changes = {}
+    if previous is current:
+        return changes
+    for old, new in zip(previous, current):
+        if old == new:
+            continue
+        change = {}
+        for key, value in new.items():
+            if key == "telemetry":
+                telemetry = {field: v for field, v in value.items() if old["telemetry"].get(field) != v}
+                if telemetry:
+                    change["telemetry"] = telemetry
+            elif old.get(key) != value:
+                change[key] = value
+        changes[str(new["node_id"])] = change
+    return changes
+
+
+class _Subscriber:
+    __slots__ = ("queue", "version")
+    
+    def __init__(self, version: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.version = version
+
+
+class StreamHub:
+    """Fans published ticks out to Server-Sent Events subscribers
+    
+    The simulation actor publishes from its own thread; delivery happens on
+    the event loop that owns the subscribers. A subscriber receives the
+    delta of a tick only if it is exactly at the delta's base version,
+    otherwise (it just joined, or its backlog overflowed) it is sent the
+    tick's keyframe instead, so clients never apply a delta to the wrong base.
+    A keyframe whose id skips versions tells the client that task
+    transitions may have been lost.
+    """
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Replaced, never mutated, so the actor thread can read it without a lock
+        self._subscribers: Tuple[_Subscriber, ...] = ()
+    
+    def __len__(self) -> int:
+        return len(self._subscribers)
+    
+    def subscribe(self, version: int) -> _Subscriber:
+        """Register a subscriber that already holds the keyframe of ``version``"""
+        self._loop = asyncio.get_running_loop()
+        subscriber = _Subscriber(version)
+        self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: _Subscriber):
+        self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+    
+    def publish(self, message: StreamMessage):
+        """Called from the actor thread after each published snapshot"""
+        if self._subscribers and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._deliver, message)
+    
+    def _deliver(self, message: StreamMessage):
+        for subscriber in self._subscribers:
+            if subscriber.version >= message.version:
+                continue
+            in_sync = message.delta is not None and subscriber.version == message.base_version
+            if in_sync and not subscriber.queue.full():
+                subscriber.queue.put_nowait(message.delta)
+            else:
+                # Drop the backlog, the keyframe supersedes it
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(message.keyframe)
+            subscriber.version = message.version
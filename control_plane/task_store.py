@@ -0,0 +1,377 @@
+import bisect
+import heapq
+import itertools
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .models import TaskPriority, TaskStatus
+from .records import TaskRecord
+
+# Dispatch order, highest priority first
+PRIORITY_ORDER = [TaskPriority.CRITICAL, TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW]
+
+# Statuses that end a task's life and move it into the bounded history
+FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+class _Submissions:
+    """Submission sequences in order with their submit times, deleted from lazily"""
+
+    def __init__(self):
+        self.orders: List[int] = []
+        self.times: List[Optional[float]] = []
+        # Submit times never decrease along the list, so they can be bisected
+        self.times_sorted = True
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def append(self, order: int, submit_time: Optional[float]):
+        if self.times_sorted and (submit_time is None or (self.times and submit_time < self.times[-1])):
+            self.times_sorted = False
+        self.orders.append(order)
+        self.times.append(submit_time)
+
+    def compact(self, by_order: Dict[int, TaskRecord]):
+        """Drop the sequences of evicted tasks"""
+        kept = [index for index, order in enumerate(self.orders) if order in by_order]
+        self.orders = [self.orders[index] for index in kept]
+        self.times = [self.times[index] for index in kept]
+        self.times_sorted = None not in self.times \
+            and all(earlier <= later for earlier, later in zip(self.times, self.times[1:]))
+
+    def span(self, after: Optional[int], submitted_after: Optional[float],
+             submitted_before: Optional[float]) -> Tuple[int, int]:
+        """Index range past cursor ``after`` that can hold tasks submitted in the time bounds"""
+        start = bisect.bisect_right(self.orders, after) if after is not None else 0
+        stop = len(self.orders)
+        if self.times_sorted:
+            if submitted_after is not None:
+                start = max(start, bisect.bisect_left(self.times, submitted_after))
+            if submitted_before is not None:
+                stop = bisect.bisect_right(self.times, submitted_before)
+        return start, stop
+
+
+class TaskStore:
+    """Indexed task registry used by the schedulers
+
+    Live tasks are indexed by id and by status. Pending tasks are additionally
+    kept in one heap per priority (ordered by submission sequence, which a
+    requeued task keeps) so the oldest task of a priority can be peeked or
+    popped in O(log n). Heap entries are removed lazily: an entry is only
+    valid while its task is still pending with the same enqueue token, and
+    a heap is compacted once its dead entries outnumber its live ones two
+    to one. Completed and failed tasks move to a bounded history that still
+    answers lookups by id.
+    
+    Every task also keeps the sequence number it was submitted with, which
+    orders ``query`` results and backs its cursors. Submission sequences
+    are kept in sorted lists, overall and per priority (appended on add,
+    deleted from lazily), so a cursor or a submit time bound seeks to its
+    position by bisection. Tasks that ran are also indexed by node until
+    they leave the history.
+    """
+
+    def __init__(self, history_size: int = 10000):
+        self.history_size = history_size
+        self._tasks: Dict[str, TaskRecord] = {}
+        self._seq: Dict[str, int] = {}
+        self._counter = itertools.count()
+        # Heap entries are (submission sequence, enqueue token, task_id)
+        self._heaps: Dict[TaskPriority, List[Tuple[int, int, str]]] = {p: [] for p in TaskPriority}
+        # Bumped on every change to a heap, so a walk over it can tell it moved
+        self._heap_versions: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}
+        self._by_status: Dict[TaskStatus, Dict[str, TaskRecord]] = {
+            status: {} for status in TaskStatus if status not in FINISHED_STATUSES
+        }
+        self._pending_by_priority: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}
+        self._history: "OrderedDict[str, TaskRecord]" = OrderedDict()
+        self._history_counts: Dict[TaskStatus, int] = {status: 0 for status in FINISHED_STATUSES}
+        self._order: Dict[str, int] = {}
+        # Submission sequences in order (may hold evicted ones) and the task of every live one
+        self._submitted = _Submissions()
+        self._submitted_by_priority: Dict[TaskPriority, _Submissions] = {p: _Submissions() for p in TaskPriority}
+        self._by_order: Dict[int, TaskRecord] = {}
+        self._recorded_by_priority: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}
+        # Tasks that ran, live or in the history, by node
+        self._by_node: Dict[int, Dict[str, TaskRecord]] = {}
+        # Node each task is indexed under, which callers may reassign before set_status
+        self._node_of: Dict[str, int] = {}
+        # Called as listener(task, old_status, new_status); old_status is None for new tasks
+        self.listeners: List[Callable[[TaskRecord, Optional[TaskStatus], TaskStatus], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks or task_id in self._history
+
+    def add(self, task: TaskRecord):
+        """Register a new pending task"""
+        if task.task_id in self:
+            raise ValueError(f"Task {task.task_id} already exists")
+        self._tasks[task.task_id] = task
+        order = next(self._counter)
+        self._order[task.task_id] = order
+        self._submitted.append(order, task.submit_time)
+        self._submitted_by_priority[task.request.priority].append(order, task.submit_time)
+        self._by_order[order] = task
+        self._recorded_by_priority[task.request.priority] += 1
+        task.status = TaskStatus.PENDING
+        self._enqueue(task)
+        for listener in self.listeners:
+            listener(task, None, TaskStatus.PENDING)
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        """Look up a live or recently finished task by id"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = self._history.get(task_id)
+        return task
+
+    def _enqueue(self, task: TaskRecord):
+        # A requeued task keeps its place; the fresh token invalidates its old entry
+        token = next(self._counter)
+        self._seq[task.task_id] = token
+        priority = task.request.priority
+        heap = self._heaps[priority]
+        heapq.heappush(heap, (self._order[task.task_id], token, task.task_id))
+        self._heap_versions[priority] += 1
+        self._pending_by_priority[priority] += 1
+        self._by_status[TaskStatus.PENDING][task.task_id] = task
+        if len(heap) > 2 * self._pending_by_priority[priority] + 8:
+            # Too many lazily deleted entries, e.g. behind a task that never fits
+            heap = [entry for entry in heap if self._is_live_entry(entry)]
+            heapq.heapify(heap)
+            self._heaps[priority] = heap
+
+    def _is_live_entry(self, entry: Tuple[int, int, str]) -> bool:
+        _, token, task_id = entry
+        return task_id in self._by_status[TaskStatus.PENDING] and self._seq.get(task_id) == token
+
+    def peek(self, priority: TaskPriority) -> Optional[TaskRecord]:
+        """Return the oldest pending task of a priority without removing it"""
+        heap = self._heaps[priority]
+        while heap and not self._is_live_entry(heap[0]):
+            heapq.heappop(heap)
+            self._heap_versions[priority] += 1
+        if heap:
+            return self._tasks[heap[0][2]]
+        return None
+
+    def pop(self, priority: TaskPriority) -> Optional[TaskRecord]:
+        """Remove and return the oldest pending task of a priority"""
+        task = self.peek(priority)
+        if task is not None:
+            heapq.heappop(self._heaps[priority])
+            self._heap_versions[priority] += 1
+            self._leave_pending(task)
+        return task
+
+    def _leave_pending(self, task: TaskRecord):
+        if self._by_status[TaskStatus.PENDING].pop(task.task_id, None) is not None:
+            self._pending_by_priority[task.request.priority] -= 1
+
+    def set_status(self, task: TaskRecord, status: TaskStatus):
+        """Move a task between status indexes"""
+        if task.task_id not in self._tasks:
+            raise KeyError(f"Task {task.task_id} is not live")
+        old_status = task.status
+        if old_status == TaskStatus.PENDING:
+            self._leave_pending(task)
+        else:
+            self._by_status[old_status].pop(task.task_id, None)
+            self._unindex_node(task)
+        task.status = status
+        if status != TaskStatus.PENDING and task.assigned_node is not None:
+            self._by_node.setdefault(task.assigned_node, {})[task.task_id] = task
+            self._node_of[task.task_id] = task.assigned_node
+        if status in FINISHED_STATUSES:
+            del self._tasks[task.task_id]
+            self._seq.pop(task.task_id, None)
+            self._history[task.task_id] = task
+            self._history_counts[status] += 1
+            while len(self._history) > self.history_size:
+                task_id, evicted = self._history.popitem(last=False)
+                self._history_counts[evicted.status] -= 1
+                self._by_order.pop(self._order.pop(task_id), None)
+                self._recorded_by_priority[evicted.request.priority] -= 1
+                self._unindex_node(evicted)
+            if len(self._submitted) > 2 * len(self._by_order) + 1024:
+                self._submitted.compact(self._by_order)
+            for priority, submitted in self._submitted_by_priority.items():
+                if len(submitted) > 2 * self._recorded_by_priority[priority] + 1024:
+                    submitted.compact(self._by_order)
+        elif status == TaskStatus.PENDING:
+            self._enqueue(task)
+        else:
+            self._by_status[status][task.task_id] = task
+        for listener in self.listeners:
+            listener(task, old_status, status)
+
+    def _unindex_node(self, task: TaskRecord):
+        node = self._node_of.pop(task.task_id, None)
+        if node is not None:
+            tasks = self._by_node[node]
+            del tasks[task.task_id]
+            if not tasks:
+                del self._by_node[node]
+
+    def pending(self) -> Iterator[TaskRecord]:
+        """Iterate pending tasks in the order they last became pending
+        
+        That is submission order, except that a requeued task comes after
+        the tasks that were already waiting.
+        """
+        return iter(list(self._by_status[TaskStatus.PENDING].values()))
+
+    def pending_in_priority_order(self) -> Iterator[TaskRecord]:
+        """Iterate pending tasks by priority, then submission order
+        
+        Each heap is walked in place as a tree, expanding the children of an
+        entry only once it is reached, so a pass that stops early only pays
+        for the entries it looked at. If the heap changes during the walk,
+        the rest is taken from a copy of its entries not yet reached.
+        """
+        for priority in PRIORITY_ORDER:
+            if self.peek(priority) is None:
+                continue
+            yield from self._walk(priority)
+
+    def _walk(self, priority: TaskPriority) -> Iterator[TaskRecord]:
+        heap = self._heaps[priority]
+        version = self._heap_versions[priority]
+        # (entry, index in heap) of the entries whose parents were reached
+        frontier = [(heap[0], 0)]
+        last = None
+        while frontier:
+            if self._heap_versions[priority] != version or self._heaps[priority] is not heap:
+                rest = [entry for entry in self._heaps[priority] if last is None or entry > last]
+                heapq.heapify(rest)
+                while rest:
+                    entry = heapq.heappop(rest)
+                    if self._is_live_entry(entry):
+                        yield self._tasks[entry[2]]
+                return
+            entry, index = heapq.heappop(frontier)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+            last = entry
+            if self._is_live_entry(entry):
+                yield self._tasks[entry[2]]
+
+    def by_status(self, status: TaskStatus) -> Dict[str, TaskRecord]:
+        """Live tasks with the given status, keyed by id (read-only view)"""
+        if status in FINISHED_STATUSES:
+            return {task_id: task for task_id, task in self._history.items() if task.status == status}
+        return self._by_status[status]
+
+    def count(self, status: TaskStatus) -> int:
+        """Number of tasks with the given status"""
+        if status in FINISHED_STATUSES:
+            return self._history_counts[status]
+        return len(self._by_status[status])
+
+    def pending_by_priority(self) -> Dict[str, int]:
+        """Queue depth per priority"""
+        return {priority.value: count for priority, count in self._pending_by_priority.items()}
+
+    def history(self) -> List[TaskRecord]:
+        """Recently finished tasks, oldest first"""
+        return list(self._history.values())
+
+    def records(self) -> List[TaskRecord]:
+        """All live and recently finished tasks in submission order"""
+        by_order = self._by_order
+        return [by_order[order] for order in self._submitted.orders if order in by_order]
+
+    def live(self) -> Iterator[TaskRecord]:
+        """Iterate all live (not finished) tasks"""
+        return iter(list(self._tasks.values()))
+
+    def query(self, statuses: Optional[List[TaskStatus]] = None, priority: Optional[TaskPriority] = None,
+              assigned_node: Optional[int] = None, submitted_after: Optional[float] = None,
+              submitted_before: Optional[float] = None, after: Optional[int] = None,
+              limit: Optional[int] = 100) -> Tuple[List[TaskRecord], Optional[int], int]:
+        """Filter tasks in submission order, starting after cursor ``after``
+
+        The most selective index serves the page. The node index (for
+        ``assigned_node``) and the status index of statuses with few live
+        tasks (such as the pending queue) are filtered and sorted whole, so
+        a page costs their size. Otherwise the submission order of
+        ``priority`` (or of all tasks) is narrowed to the cursor and the
+        submit time bounds by bisection and walked until ``limit`` matches,
+        which is O(limit) unless a status filter is sparse within it.
+        Returns the page, the cursor of the next page
+        (None on the last page) and the number of matches from the cursor
+        on. The count is only computed when the indexes give it directly
+        (no filters or a single status, without a cursor) and is None
+        otherwise. With ``limit=None`` only the count is computed, by a full
+        scan if needed.
+        """
+        status_set = set(statuses) if statuses else None
+        filtered = priority is not None or assigned_node is not None \
+            or submitted_after is not None or submitted_before is not None
+        count = None
+        if after is None and not filtered:
+            if status_set is None:
+                count = len(self._by_order)
+            elif len(status_set) == 1:
+                count = self.count(statuses[0])
+            if limit is None and count is not None:
+                return [], None, count
+
+        def matches(task: TaskRecord) -> bool:
+            if status_set is not None and task.status not in status_set:
+                return False
+            if priority is not None and task.request.priority != priority:
+                return False
+            if assigned_node is not None and task.assigned_node != assigned_node:
+                return False
+            if submitted_after is not None and (task.submit_time is None or task.submit_time < submitted_after):
+                return False
+            if submitted_before is not None and (task.submit_time is None or task.submit_time > submitted_before):
+                return False
+            return True
+
+        # Small indexes are cheaper to sort than to find in the submission order
+        source = None
+        if assigned_node is not None:
+            source = self._by_node.get(assigned_node, {}).values()
+        elif status_set is not None and not status_set & set(FINISHED_STATUSES) \
+                and sum(self.count(status) for status in status_set) <= len(self._by_order) // 8:
+            source = (task for status in status_set for task in self._by_status[status].values())
+        if source is not None:
+            order = self._order
+            candidates = [(order[task.task_id], task) for task in source
+                          if (after is None or order[task.task_id] > after) and matches(task)]
+            if limit is None:
+                return [], None, len(candidates)
+            page = heapq.nsmallest(limit + 1, candidates, key=lambda candidate: candidate[0])
+            next_cursor = page[limit - 1][0] if len(page) > limit else None
+            return [task for _, task in page[:limit]], next_cursor, len(candidates)
+
+        submitted = self._submitted if priority is None else self._submitted_by_priority[priority]
+        start, stop = submitted.span(after, submitted_after, submitted_before)
+        orders = submitted.orders
+        by_order = self._by_order
+        if limit is None:
+            total = 0
+            for index in range(start, stop):
+                task = by_order.get(orders[index])
+                if task is not None and matches(task):
+                    total += 1
+            return [], None, total
+        page = []
+        next_cursor = None
+        for index in range(start, stop):
+            task = by_order.get(orders[index])
+            if task is None or not matches(task):
+                continue
+            if len(page) == limit:
+                next_cursor = self._order[page[-1].task_id]
+                break
+            page.append(task)
+        return page, next_cursor, count
\ No newline at end of file
@@ -1,14 +1,31 @@
+import math
+from typing import Any, Dict, List, Tuple
+
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dash_table, dcc, html, Input, Output, Patch, State
+import numpy as np
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots
-import requests
-import time
-from threading import Thread
-import pandas as pd
+
+from config import Config
+from dashboard.stream_client import ClusterStream
 
 # API base URL
-API_BASE = "http://localhost:8000"
+API_BASE = f"http://localhost:{Config.API_PORT}"
+
+# Cluster state pushed by the control plane, started on the first refresh
+cluster_stream = ClusterStream(API_BASE)
+
+# Nodes are shown in at most this many groups, so the overview stays the same size as the grid grows
+MAX_GROUPS = 64
+TASK_PAGE_SIZE = 20
+
+# (telemetry array, title, colorscale, range) of each overview row
+METRICS = [
+    ("temperature", "Temperature (°C)", "RdYlGn_r", (25, 95)),
+    ("utilization", "Utilization (%)", "Blues", (0, 100)),
+    ("power_usage", "Power (W)", "Oranges", (0, 300)),
+]
 
 # Initialize Dash app
 app = dash.Dash(__name__)
@@ -17,112 +34,189 @@ app.title = "AI GPU Cluster Dashboard"
 # Layout
 app.layout = html.Div([
     html.H1("AI GPU Cluster Orchestrator Dashboard"),
-    
+
     dcc.Interval(
         id='interval-component',
         interval=2*1000,  # Update every 2 seconds
         n_intervals=0
     ),
-    
+    # Shape of the figures the browser holds; unchanged shapes get patched in place
+    dcc.Store(id='overview-shape'),
+    dcc.Store(id='drilldown-shape'),
+
     html.Div([
         html.Div([
             html.H3("Cluster Overview"),
             html.Div(id="cluster-stats")
         ], className="four columns"),
-        
+
         html.Div([
-            html.H3("Temperature Monitoring"),
-            dcc.Graph(id='temperature-graph')
+            html.H3("Telemetry by Node Group"),
+            html.P("Mean per group of nodes (hover for the max); click a group to drill down."),
+            dcc.Graph(id='overview-graph')
         ], className="eight columns"),
     ], className="row"),
-    
+
     html.Div([
-        html.Div([
-            html.H3("GPU Utilization"),
-            dcc.Graph(id='utilization-graph')
-        ], className="six columns"),
-        
-        html.Div([
-            html.H3("Power Consumption"),
-            dcc.Graph(id='power-graph')
-        ], className="six columns"),
-    ], className="row"),
-    
+        html.H3("Node Group Detail"),
+        dcc.Graph(id='drilldown-graph')
+    ]),
+
     html.Div([
         html.H3("Task Queue"),
-        html.Div(id="task-queue")
+        dash_table.DataTable(
+            id='task-table',
+            columns=[{"name": "Task", "id": "task_id"},
+                     {"name": "Status", "id": "status"},
+                     {"name": "Node", "id": "assigned_node"}],
+            page_current=0,
+            page_size=TASK_PAGE_SIZE,
+            page_action='custom',
+        )
     ])
 ])
 
+
+def _group_size(num_nodes: int) -> int:
+    return max(1, math.ceil(num_nodes / MAX_GROUPS))
+
+
+def _aggregate(values: np.ndarray, size: int) -> Tuple[List[float], List[float]]:
+    """Mean and max of consecutive groups of ``size`` nodes"""
+    if not len(values):
+        return [], []
+    starts = np.arange(0, len(values), size)
+    counts = np.diff(np.append(starts, len(values)))
+    means = np.add.reduceat(values, starts) / counts
+    maxes = np.maximum.reduceat(values, starts)
+    return np.round(means, 1).tolist(), np.round(maxes, 1).tolist()
+
+
+def _group_labels(num_nodes: int, size: int) -> List[str]:
+    return [f"{start}-{min(start + size, num_nodes) - 1}" for start in range(0, num_nodes, size)]
+
+
+def _overview_figure(labels: List[str], aggregates: Dict[str, Tuple[List[float], List[float]]]) -> go.Figure:
+    fig = make_subplots(rows=len(METRICS), cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=[title for _, title, _, _ in METRICS])
+    for row, (key, title, colorscale, (zmin, zmax)) in enumerate(METRICS, start=1):
+        means, maxes = aggregates[key]
+        fig.add_trace(go.Heatmap(
+            x=labels, y=[""], z=[means], customdata=[maxes],
+            colorscale=colorscale, zmin=zmin, zmax=zmax, showscale=False,
+            hovertemplate="Nodes %{x}<br>mean %{z}<br>max %{customdata}<extra>" + title + "</extra>",
+        ), row=row, col=1)
+    fig.update_layout(height=360, margin=dict(l=20, r=20, t=40, b=40))
+    fig.update_xaxes(showticklabels=False)
+    fig.update_xaxes(showticklabels=True, row=len(METRICS), col=1)
+    return fig
+
+
+def _drilldown_figure(nodes: List[Dict[str, Any]], title: str) -> go.Figure:
+    fig = make_subplots(rows=1, cols=len(METRICS), subplot_titles=[title for _, title, _, _ in METRICS])
+    node_ids = [f"Node {node['node_id']}" for node in nodes]
+    for col, (key, _, _, _) in enumerate(METRICS, start=1):
+        fig.add_trace(go.Bar(x=node_ids, y=[node['telemetry'][key] for node in nodes], showlegend=False),
+                      row=1, col=col)
+    fig.add_hline(y=85, line_dash="dash", line_color="red", row=1, col=1)
+    fig.update_layout(title=title, height=320, margin=dict(l=20, r=20, t=60, b=40))
+    return fig
+
+
 # Callbacks
 @app.callback(
     [Output('cluster-stats', 'children'),
-     Output('temperature-graph', 'figure'),
-     Output('utilization-graph', 'figure'),
-     Output('power-graph', 'figure'),
-     Output('task-queue', 'children')],
-    [Input('interval-component', 'n_intervals')]
+     Output('overview-graph', 'figure'),
+     Output('overview-shape', 'data')],
+    [Input('interval-component', 'n_intervals')],
+    [State('overview-shape', 'data')]
 )
-def update_dashboard(n):
+def update_overview(n, shape):
     try:
-        # Get cluster status
-        response = requests.get(f"{API_BASE}/cluster/status")
-        cluster_status = response.json()
-        
-        # Get tasks
-        response = requests.get(f"{API_BASE}/tasks")
-        tasks = response.json()
-        
-        # Cluster stats
+        # Cluster status comes from the stream, no polling
+        cluster_stream.start()
+        summary = cluster_stream.get_summary()
+        if summary is None:
+            return html.Div(f"Waiting for cluster stream... {cluster_stream.error or ''}"), {}, None
+
+        states = summary['states']
         stats = html.Div([
-            html.P(f"Total Nodes: {cluster_status['total_nodes']}"),
-            html.P(f"Available Nodes: {cluster_status['available_nodes']}"),
-            html.P(f"Pending Tasks: {cluster_status['pending_tasks']}"),
-            html.P(f"Running Tasks: {cluster_status['running_tasks']}"),
+            html.P(f"Total Nodes: {summary['total_nodes']}"),
+            html.P(f"Available Nodes: {summary['available_nodes']}"),
+            html.P(f"Busy / Idle / Throttled: {states.get('busy', 0)} / {states.get('idle', 0)} / "
+                   f"{states.get('throttled', 0)}"),
+            html.P(f"Pending Tasks: {summary['pending_tasks']}"),
+            html.P(f"Running Tasks: {summary['running_tasks']}"),
         ])
-        
-        # Prepare data for graphs
-        nodes = cluster_status['nodes']
-        node_ids = [f"Node {node['node_id']}" for node in nodes]
-        temperatures = [node['telemetry']['temperature'] for node in nodes]
-        utilizations = [node['telemetry']['utilization'] for node in nodes]
-        power_usage = [node['telemetry']['power_usage'] for node in nodes]
-        states = [node['state'] for node in nodes]
-        
-        # Temperature graph
-        temp_fig = go.Figure(
-            data=[go.Bar(x=node_ids, y=temperatures, 
-                         marker_color=['red' if temp > 80 else 'orange' if temp > 70 else 'green' 
-                                       for temp in temperatures])],
-            layout=go.Layout(title="GPU Temperatures (°C)")
-        )
-        temp_fig.add_hline(y=85, line_dash="dash", line_color="red", annotation_text="Danger Zone")
-        temp_fig.add_hline(y=70, line_dash="dash", line_color="orange", annotation_text="Warning Zone")
-        
-        # Utilization graph
-        util_fig = go.Figure(
-            data=[go.Bar(x=node_ids, y=utilizations,
-                        marker_color=['green' if util > 0 else 'blue' for util in utilizations])],
-            layout=go.Layout(title="GPU Utilization (%)")
-        )
-        
-        # Power graph
-        power_fig = go.Figure(
-            data=[go.Bar(x=node_ids, y=power_usage)],
-            layout=go.Layout(title="Power Consumption (W)")
-        )
-        
-        # Task queue
-        task_list = html.Ul([
-            html.Li(f"{task['task_id']} - {task['status']} - "
-                   f"Node: {task.get('assigned_node', 'N/A')}")
-            for task in tasks
-        ])
-        
-        return stats, temp_fig, util_fig, power_fig, task_list
-        
+
+        metrics = cluster_stream.get_metrics()
+        num_nodes = len(metrics["temperature"])
+        size = _group_size(num_nodes)
+        aggregates = {key: _aggregate(metrics[key], size) for key, _, _, _ in METRICS}
+        new_shape = [num_nodes, size]
+        if shape != new_shape:
+            return stats, _overview_figure(_group_labels(num_nodes, size), aggregates), new_shape
+
+        # Same groups as the figure in the browser: only send the new values
+        patch = Patch()
+        for index, (key, _, _, _) in enumerate(METRICS):
+            means, maxes = aggregates[key]
+            patch["data"][index]["z"] = [means]
+            patch["data"][index]["customdata"] = [maxes]
+        return stats, patch, dash.no_update
+
     except Exception as e:
-        return html.Div(f"Error: {str(e)}"), {}, {}, {}, html.Div()
+        return html.Div(f"Error: {str(e)}"), {}, None
+
+
+@app.callback(
+    [Output('drilldown-graph', 'figure'),
+     Output('drilldown-shape', 'data')],
+    [Input('interval-component', 'n_intervals'),
+     Input('overview-graph', 'clickData')],
+    [State('drilldown-shape', 'data')]
+)
+def update_drilldown(n, click_data, shape):
+    try:
+        summary = cluster_stream.get_summary()
+        if summary is None:
+            return {}, None
+        num_nodes = summary['total_nodes']
+        size = _group_size(num_nodes)
+        group = 0
+        if click_data:
+            # Group labels are "first-last" node ids
+            group = int(str(click_data["points"][0]["x"]).split("-")[0]) // size
+        start = min(group * size, max(num_nodes - 1, 0))
+        nodes = cluster_stream.get_nodes(start, start + size)
+        new_shape = [start, len(nodes)]
+        if shape != new_shape:
+            title = f"Nodes {start}-{start + len(nodes) - 1}"
+            return _drilldown_figure(nodes, title), new_shape
+
+        patch = Patch()
+        for index, (key, _, _, _) in enumerate(METRICS):
+            patch["data"][index]["y"] = [node['telemetry'][key] for node in nodes]
+        return patch, dash.no_update
+
+    except Exception:
+        return {}, None
+
+
+@app.callback(
+    [Output('task-table', 'data'),
+     Output('task-table', 'page_count')],
+    [Input('interval-component', 'n_intervals'),
+     Input('task-table', 'page_current'),
+     Input('task-table', 'page_size')]
+)
+def update_task_table(n, page_current, page_size):
+    # Only the visible page is sent to the browser
+    tasks, total = cluster_stream.get_tasks((page_current or 0) * page_size, page_size)
+    rows = [{"task_id": task["task_id"], "status": task["status"],
+             "assigned_node": task.get("assigned_node")} for task in tasks]
+    return rows, max(1, math.ceil(total / page_size))
+
 
 if __name__ == '__main__':
-    app.run_server(debug=True, port=8050)
\ No newline at end of file
+    app.run_server(debug=True, port=Config.DASHBOARD_PORT)
\ No newline at end of file
@@ -0,0 +1,168 @@
+import copy
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+# Node telemetry kept as arrays for aggregated views
+TELEMETRY_KEYS = ("temperature", "utilization", "power_usage")
+
+
+class ClusterStream:
+    """Local copy of the cluster state, kept current from the control plane's /stream endpoint
+    
+    A background thread consumes the Server-Sent Events stream: keyframes
+    replace the whole status, deltas patch only the changed node fields and
+    task transitions. The task list is seeded from ``GET /tasks`` once the
+    first event of every (re)connect has arrived, so the subscription
+    already covers every transition the seed misses, and again whenever the
+    server resyncs the stream. Dash callbacks read the local copy instead
+    of polling.
+    
+    Node telemetry is also kept in one array per metric, patched in place
+    by deltas, so aggregates over thousands of nodes are cheap to compute.
+    """
+    
+    def __init__(self, api_base: str, retry_delay: float = 2.0):
+        self.api_base = api_base
+        self.retry_delay = retry_delay
+        self.connected = False
+        self.error: Optional[str] = None
+        self._status: Optional[Dict[str, Any]] = None
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._metrics: Dict[str, np.ndarray] = {}
+        self._states: List[str] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start consuming the stream (idempotent)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cluster-stream", daemon=True)
+            self._thread.start()
+    
+    def get_state(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Copy of the current cluster status and live tasks"""
+        with self._lock:
+            return copy.deepcopy(self._status), list(self._tasks.values())
+    
+    def get_summary(self) -> Optional[Dict[str, Any]]:
+        """Cluster counters and node counts per state, without the node list"""
+        with self._lock:
+            if self._status is None:
+                return None
+            summary = {key: self._status[key] for key in
+                       ("timestamp", "total_nodes", "available_nodes", "pending_tasks", "running_tasks")}
+            summary["states"] = dict(Counter(self._states))
+            return summary
+    
+    def get_metrics(self) -> Dict[str, np.ndarray]:
+        """Copy of the per-node telemetry arrays, indexed by node id"""
+        with self._lock:
+            return {key: values.copy() for key, values in self._metrics.items()}
+    
+    def get_nodes(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Copy of the status of nodes ``start`` to ``stop - 1``"""
+        with self._lock:
+            if self._status is None:
+                return []
+            return copy.deepcopy(self._status["nodes"][start:stop])
+    
+    def get_tasks(self, offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """A page of live tasks and the total number of live tasks"""
+        with self._lock:
+            page = list(itertools.islice(self._tasks.values(), offset, offset + limit))
+            return copy.deepcopy(page), len(self._tasks)
+    
+    def _run(self):
+        while True:
+            try:
+                with requests.get(f"{self.api_base}/stream", stream=True, timeout=(5, 60)) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    self.error = None
+                    self._consume(response.iter_lines(decode_unicode=True))
+            except (requests.RequestException, ValueError) as e:
+                self.error = str(e)
+            self.connected = False
+            time.sleep(self.retry_delay)
+    
+    def _seed_tasks(self):
+        tasks: Dict[str, Dict[str, Any]] = {}
+        params = {
+            "status": ["pending", "scheduled", "running"],
+            "fields": "task_id,status,assigned_node",
+            "limit": 1000,
+        }
+        while True:
+            page = requests.get(f"{self.api_base}/tasks", params=params, timeout=10).json()
+            for task in page["tasks"]:
+                tasks[task["task_id"]] = task
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+        with self._lock:
+            self._tasks = tasks
+    
+    def _consume(self, lines):
+        last_id = None
+        event, event_id, data = None, None, []
+        for line in lines:
+            if line:
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("id:"):
+                    event_id = int(line[3:].strip())
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                continue
+            # A blank line ends an event; comments (keepalives) carry no data
+            if data:
+                if last_id is None or (event == "keyframe" and event_id > last_id + 1):
+                    # Subscribed, or resynced by the server after skipping transitions:
+                    # (re)seed, the transitions queued behind this event replay on top
+                    self._seed_tasks()
+                self._apply(event, json.loads("\n".join(data)))
+                last_id = event_id
+            event, event_id, data = None, None, []
+    
+    def _apply_transitions(self, transitions: List[Dict[str, Any]]):
+        for transition in transitions:
+            if transition["status"] in ("completed", "failed"):
+                self._tasks.pop(transition["task_id"], None)
+            else:
+                self._tasks[transition["task_id"]] = transition
+    
+    def _apply(self, event: Optional[str], data: Any):
+        with self._lock:
+            if event == "keyframe":
+                self._status = data
+                nodes = data["nodes"]
+                self._metrics = {key: np.array([node["telemetry"][key] for node in nodes], dtype=float)
+                                 for key in TELEMETRY_KEYS}
+                self._states = [node["state"] for node in nodes]
+            elif event == "tasks":
+                self._apply_transitions(data)
+            elif event == "delta" and self._status is not None:
+                for key in ("timestamp", "available_nodes", "pending_tasks", "running_tasks"):
+                    self._status[key] = data[key]
+                nodes = self._status["nodes"]
+                for node_id, change in data["nodes"].items():
+                    index = int(node_id)
+                    node = nodes[index]
+                    for key, value in change.items():
+                        if key == "telemetry":
+                            node["telemetry"].update(value)
+                            for metric, metric_value in value.items():
+                                if metric in self._metrics:
+                                    self._metrics[metric][index] = metric_value
+                        else:
+                            node[key] = value
+                            if key == "state":
+                                self._states[index] = value
+                self._apply_transitions(data["tasks"])
@@ -1,33 +1,45 @@
-import uvicorn
+import argparse
 import threading
-from control_plane.api import app
-from dashboard.app import app as dash_app
-from simulation.gpu_grid import GPUGrid
-import simpy
-from control_plane.scheduler import IntelligentScheduler
-import time
-
-def run_simulation():
-    """Run the simulation in a separate thread"""
-    env = simpy.Environment()
-    grid = GPUGrid(env, num_nodes=8)
-    scheduler = IntelligentScheduler(grid)
-    
-    # Store in global context if needed, or use a shared state solution
-    print("Simulation started...")
-    while True:
-        env.run(until=env.now + 10)
-        scheduler.schedule()
-        time.sleep(1)  # Real-time throttle
+from typing import List, Optional
+
+from config import Config
+
+DEFAULT_CONFIG = "config.json"
+
+
+def run_dashboard():
+    """Serve the dashboard from a background thread
+
+    Dash and Plotly are only imported here, so an API-only launch never
+    loads them. NumPy is still loaded by the API whenever telemetry history
+    (on by default), vectorized telemetry or the batch scheduler is enabled.
+    The dashboard is a client of the API's stream and shares its simulation.
+    """
+    from dashboard.app import app as dash_app
+    dash_app.run(host=Config.API_HOST, port=Config.DASHBOARD_PORT, debug=False)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="AI GPU cluster orchestrator")
+    parser.add_argument("--config", default=DEFAULT_CONFIG,
+                        help="JSON file overriding config.py settings (ignored if missing)")
+    parser.add_argument("--no-dashboard", action="store_true", help="Run the API only")
+    args = parser.parse_args(argv)
+
+    # Load the configuration before anything reads it: the API builds its
+    # simulation from Config when the server starts
+    Config.load_from_file(args.config)
+    dashboard = Config.DASHBOARD_ENABLED and not args.no_dashboard
+
+    import uvicorn
+    from control_plane.api import app
+
+    if dashboard:
+        threading.Thread(target=run_dashboard, name="dashboard", daemon=True).start()
+        print(f"Starting Dashboard on http://localhost:{Config.DASHBOARD_PORT}")
+    print(f"Starting API server on http://localhost:{Config.API_PORT}")
+    uvicorn.run(app, host=Config.API_HOST, port=Config.API_PORT)
+
 
 if __name__ == "__main__":
-    # Start simulation thread
-    sim_thread = threading.Thread(target=run_simulation, daemon=True)
-    sim_thread.start()
-    
-    # Start API server
-    print("Starting API server on http://localhost:8000")
-    print("Starting Dashboard on http://localhost:8050")
-    
-    # Run FastAPI app
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    main()
@@ -0,0 +1,128 @@
+import heapq
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Bucket key: (gpu_type, free memory class). A node's class is its free
+# memory rounded down to a whole GB, so task sizes that do not divide the
+# GPU memory cannot create an unbounded number of buckets.
+BucketKey = Tuple[str, int]
+
+
+def memory_class(free_memory: float) -> int:
+    """Capacity class of a node with ``free_memory`` GB free"""
+    return math.floor(free_memory)
+
+
+def default_node_key(node) -> float:
+    """Default ordering for candidates: coolest, least utilized first (lower is better)"""
+    return node.telemetry.temperature + node.telemetry.utilization
+
+
+class AvailabilityIndex:
+    """Live index of the nodes that can accept tasks
+
+    Nodes are bucketed by GPU type and free memory class so a task only
+    looks at buckets it fits in; empty buckets are dropped. Every node of a
+    class at or above a task's size fits it, so only the class holding the
+    size itself needs a per-node check. Each bucket keeps a heap ordered by
+    ``key`` (lower is better). Telemetry moves with simulated time, so a bucket's heap is
+    rebuilt at most once per simulation timestamp; within a timestamp nodes
+    that become available are pushed and nodes that leave are dropped lazily.
+    """
+
+    def __init__(self, env, key: Callable = default_node_key):
+        self.env = env
+        self.key = key
+        self._buckets: Dict[BucketKey, Dict[int, object]] = {}
+        self._bucket_of: Dict[int, BucketKey] = {}
+        self._heaps: Dict[BucketKey, List[Tuple[float, int]]] = {}
+        self._built_at: Dict[BucketKey, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def __contains__(self, node) -> bool:
+        return node.node_id in self._bucket_of
+
+    def set_key(self, key: Callable):
+        """Change the candidate ordering and invalidate all heaps"""
+        self.key = key
+        self._built_at.clear()
+
+    def add(self, node):
+        """Mark a node as available (or refresh its bucket)"""
+        bucket = (node.gpu_type, memory_class(node.free_memory))
+        current = self._bucket_of.get(node.node_id)
+        if current == bucket:
+            return
+        if current is not None:
+            self.discard(node)
+        self._bucket_of[node.node_id] = bucket
+        self._buckets.setdefault(bucket, {})[node.node_id] = node
+        if self._built_at.get(bucket) == self.env.now:
+            heap = self._heaps[bucket]
+            heapq.heappush(heap, (self.key(node), node.node_id))
+            if len(heap) > 2 * len(self._buckets[bucket]) + 8:
+                # Too many lazily deleted entries, rebuild on next read
+                del self._built_at[bucket]
+
+    def discard(self, node):
+        """Mark a node as unavailable"""
+        bucket = self._bucket_of.pop(node.node_id, None)
+        if bucket is not None:
+            members = self._buckets[bucket]
+            del members[node.node_id]
+            if not members:
+                del self._buckets[bucket]
+                self._heaps.pop(bucket, None)
+                self._built_at.pop(bucket, None)
+
+    def nodes(self) -> List:
+        """All available nodes"""
+        return [node for bucket in self._buckets.values() for node in bucket.values()]
+
+    def first(self, min_memory: float = 0.0) -> Optional[object]:
+        """Any available node with at least ``min_memory`` GB free, without ordering"""
+        for bucket in self.buckets(min_memory):
+            for node in self._buckets[bucket].values():
+                if node.free_memory >= min_memory:
+                    return node
+        return None
+
+    def buckets(self, min_memory: float = 0.0) -> Iterator[BucketKey]:
+        """Buckets holding at least one node with ``min_memory`` GB free"""
+        for bucket, members in self._buckets.items():
+            if bucket[1] >= min_memory or (bucket[1] > min_memory - 1
+                                           and any(node.free_memory >= min_memory for node in members.values())):
+                yield bucket
+
+    def counts(self) -> Dict[BucketKey, int]:
+        """Number of available nodes in every non-empty bucket"""
+        return {bucket: len(members) for bucket, members in self._buckets.items()}
+
+    def best(self, bucket: BucketKey) -> Optional[object]:
+        """Best node of a bucket according to ``key``"""
+        members = self._buckets.get(bucket)
+        if not members:
+            return None
+        if self._built_at.get(bucket) != self.env.now:
+            heap = [(self.key(node), node_id) for node_id, node in members.items()]
+            heapq.heapify(heap)
+            self._heaps[bucket] = heap
+            self._built_at[bucket] = self.env.now
+        heap = self._heaps[bucket]
+        while heap and heap[0][1] not in members:
+            heapq.heappop(heap)
+        return members[heap[0][1]] if heap else None
+
+    def candidates(self, memory_required: float = 0.0, exclude: Optional[object] = None) -> Iterator:
+        """Best node of every bucket that can fit ``memory_required`` GB, other than ``exclude``"""
+        for bucket in list(self.buckets(memory_required)):
+            node = self.best(bucket)
+            if node is not None and (node is exclude or node.free_memory < memory_required):
+                # Only in the class holding the task's size can the best node be too small
+                others = [other for other in self._buckets[bucket].values()
+                          if other is not exclude and other.free_memory >= memory_required]
+                node = min(others, key=self.key) if others else None
+            if node is not None:
+                yield node
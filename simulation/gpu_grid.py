@@ -1,28 +1,81 @@
 import simpy
 import random
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from .gpu_node import GPUNode, GPUState
+from .availability import AvailabilityIndex
+from config import Config
 
 class GPUGrid:
     """Simulates a grid of GPU nodes"""
     
-    def __init__(self, env: simpy.Environment, num_nodes: int = 8):
+    def __init__(self, env: simpy.Environment, num_nodes: int = 8,
+                 vectorized_telemetry: Optional[bool] = None, seed: Optional[int] = None,
+                 gpu_types: Optional[List[str]] = None, telemetry_history: Optional[bool] = None):
         self.env = env
+        # Seeds GPU type selection and all node telemetry, for reproducible runs
+        self.rng = random.Random(seed)
         self.nodes: List[GPUNode] = []
-        self._initialize_nodes(num_nodes)
+        self.availability = AvailabilityIndex(env)
+        # Called as listener(node, old_state, new_state) for every node transition
+        self.state_listeners: List[Callable[[GPUNode, GPUState, GPUState], None]] = []
+        if vectorized_telemetry is None:
+            vectorized_telemetry = Config.VECTORIZED_TELEMETRY
+        self.telemetry_engine = None
+        if vectorized_telemetry:
+            # Imported lazily so NumPy is only needed when the engine is enabled
+            from .telemetry_engine import TelemetryEngine
+            self.telemetry_engine = TelemetryEngine(env, num_nodes, seed=seed)
+        self._initialize_nodes(num_nodes, gpu_types)
+        self.telemetry_history = None
+        if telemetry_history is None:
+            telemetry_history = Config.TELEMETRY_HISTORY
+        if telemetry_history:
+            # Imported lazily so NumPy is only needed when history is enabled
+            from .timeseries import TelemetryHistory
+            self.telemetry_history = TelemetryHistory(
+                num_nodes,
+                raw_capacity=Config.TELEMETRY_RAW_SECONDS,
+                rollups={float(period): capacity for period, capacity in Config.TELEMETRY_ROLLUPS.items()},
+            )
+            env.process(self.telemetry_history.run(self))
     
-    def _initialize_nodes(self, num_nodes: int):
-        """Initialize GPU nodes with different types"""
-        gpu_types = ["A100", "V100", "RTX4090"]
+    def _initialize_nodes(self, num_nodes: int, gpu_types: Optional[List[str]] = None):
+        """Initialize GPU nodes with the given or randomly chosen types"""
         for i in range(num_nodes):
-            gpu_type = random.choice(gpu_types)
-            node = GPUNode(self.env, i, gpu_type)
+            gpu_type = gpu_types[i] if gpu_types else self.rng.choice(["A100", "V100", "RTX4090"])
+            node = GPUNode(self.env, i, gpu_type, self.telemetry_engine, self.rng)
+            node.state_listeners.append(self._on_node_state_change)
+            node.capacity_listeners.append(self._update_availability)
             self.nodes.append(node)
+            self._update_availability(node)
+    
+    def _update_availability(self, node: GPUNode):
+        """Index a node while it is idle or busy with memory to spare, in its free-memory bucket"""
+        if node.state in (GPUState.IDLE, GPUState.BUSY) and node.free_memory > 0:
+            self.availability.add(node)
+        else:
+            self.availability.discard(node)
+    
+    def _on_node_state_change(self, node: GPUNode, old_state: GPUState, new_state: GPUState):
+        """Keep the availability index in sync with node state transitions"""
+        self._update_availability(node)
+        for listener in self.state_listeners:
+            listener(node, old_state, new_state)
     
     def get_available_nodes(self) -> List[GPUNode]:
-        """Get list of available nodes that can accept tasks"""
-        return [node for node in self.nodes 
-                if node.telemetry.state in [GPUState.IDLE]]
+        """Get list of nodes with free memory that can accept tasks"""
+        return self.availability.nodes()
+    
+    def node_states(self) -> List[Tuple[str, float, str]]:
+        """Compact (GPU type, temperature, state) of every node, for snapshots"""
+        return [(node.gpu_type, node.telemetry.temperature, node.state.value) for node in self.nodes]
+    
+    def restore_node_states(self, states: List[Tuple[str, float, str]]):
+        """Restore temperatures and throttling from ``node_states`` onto idle nodes"""
+        for node, (_, temperature, state) in zip(self.nodes, states):
+            node.telemetry.temperature = temperature
+            if state == GPUState.THROTTLED.value:
+                node.set_state(GPUState.THROTTLED)
     
     def get_node_by_id(self, node_id: int) -> Optional[GPUNode]:
         """Get a specific node by its ID"""
@@ -30,12 +83,17 @@ class GPUGrid:
             return self.nodes[node_id]
         return None
     
+    def _node_statuses(self) -> List[Dict[str, Any]]:
+        if self.telemetry_engine is not None:
+            return self.telemetry_engine.node_statuses()
+        return [node.get_status() for node in self.nodes]
+    
     def get_grid_status(self) -> Dict[str, Any]:
         """Get status of all nodes in the grid"""
         return {
             "timestamp": self.env.now,
-            "nodes": [node.get_status() for node in self.nodes],
-            "available_nodes": len(self.get_available_nodes()),
+            "nodes": self._node_statuses(),
+            "available_nodes": len(self.availability),
             "total_nodes": len(self.nodes)
         }
     
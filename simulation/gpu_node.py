@@ -1,8 +1,11 @@
 import simpy
 import random
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 from dataclasses import dataclass, field
 from enum import Enum
+from config import Config
+from .thermal import (COOLING, COOLING_MEAN, HEATING, MAX_TEMPERATURE, RECOVERY_TEMPERATURE, ROOM_TEMPERATURE,
+                      THROTTLE_TEMPERATURE, throttle_time, throttled_share)
 
 class GPUState(Enum):
     IDLE = "idle"
@@ -10,6 +13,16 @@ class GPUState(Enum):
     OFFLINE = "offline"
     THROTTLED = "throttled"
 
+class TaskFailed(Exception):
+    """Failure value of a task completion event"""
+    
+    def __init__(self, node_id: int, cause: Any = None, work_done: float = 0.0):
+        super().__init__(f"Task on node {node_id} failed: {cause}")
+        self.node_id = node_id
+        self.cause = cause
+        # Seconds of (unthrottled) work completed before the failure
+        self.work_done = work_done
+
 @dataclass
 class GPUTelemetry:
     temperature: float = 30.0
@@ -21,71 +34,216 @@ class GPUTelemetry:
 class GPUNode:
     """Simulates a single GPU node with telemetry and task execution"""
     
-    def __init__(self, env: simpy.Environment, node_id: int, gpu_type: str = "A100"):
+    def __init__(self, env: simpy.Environment, node_id: int, gpu_type: str = "A100",
+                 telemetry_engine=None, rng: Optional[random.Random] = None):
         self.env = env
+        self.rng = rng if rng is not None else random.Random()
         self.node_id = node_id
         self.gpu_type = gpu_type
-        self.telemetry = GPUTelemetry()
-        self.current_task: Optional[Dict[str, Any]] = None
-        self.task_completion_event: Optional[simpy.Event] = None
+        self.memory_gb = Config.GPU_CONFIGS.get(gpu_type, {}).get("memory_gb", 0)
+        # Running tasks by task id; they share the node by memory
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.task_processes: Dict[str, simpy.Process] = {}
+        # Expected end time of every running task at the current speed
+        self.task_ends: Dict[str, float] = {}
+        self.used_memory = 0.0
+        # Triggered (and replaced) whenever the node's speed changes
+        self._speed_changed = env.event()
+        # Called as listener(node, old_state, new_state) on every state transition
+        self.state_listeners: List[Callable[["GPUNode", GPUState, GPUState], None]] = []
+        # Called as listener(node) whenever a task starts or ends on the node
+        self.capacity_listeners: List[Callable[["GPUNode"], None]] = []
+        
+        if telemetry_engine is not None:
+            # Telemetry lives in the grid-level arrays and is updated in batch
+            self.telemetry = telemetry_engine.view(self)
+            self.telemetry_process = None
+        else:
+            self.telemetry = GPUTelemetry()
+            # Start background processes
+            self.telemetry_process = env.process(self._update_telemetry())
+    
+    @property
+    def state(self) -> GPUState:
+        return self.telemetry.state
+    
+    @property
+    def free_memory(self) -> float:
+        """Memory (GB) available to a new task"""
+        return self.memory_gb - self.used_memory
+    
+    @property
+    def load(self) -> float:
+        """Fraction of the node's memory held by running tasks"""
+        return self.used_memory / self.memory_gb if self.memory_gb else 0.0
+    
+    @property
+    def speed(self) -> float:
+        """Rate at which running tasks make progress (slower while throttled)"""
+        return Config.THROTTLE_SPEED if self.telemetry.state == GPUState.THROTTLED else 1.0
+    
+    @property
+    def current_task(self) -> Optional[Dict[str, Any]]:
+        """Oldest task running on the node, if any"""
+        return next(iter(self.tasks.values()), None)
+    
+    def set_state(self, state: GPUState):
+        """Transition to a new state and notify listeners"""
+        old_state = self.telemetry.state
+        if old_state == state:
+            return
+        self.telemetry.state = state
+        if GPUState.THROTTLED in (old_state, state):
+            # Running tasks re-plan their remaining work at the new speed
+            changed, self._speed_changed = self._speed_changed, self.env.event()
+            changed.succeed()
+        for listener in self.state_listeners:
+            listener(self, old_state, state)
+    
+    def projected_throttle(self, duration: float, memory_required: float = 0.0) -> float:
+        """Expected fraction of the next ``duration`` seconds the node spends throttled
+        
+        Projects the temperature with the load of the running tasks, which
+        drops as each one ends, plus ``memory_required`` GB held for the
+        whole horizon.
+        """
+        if not self.memory_gb or duration <= 0:
+            return 0.0
+        now = self.env.now
+        used = self.used_memory + memory_required
+        segments = []
+        start = 0.0
+        for end, task_id in sorted((end - now, task_id) for task_id, end in self.task_ends.items()):
+            if end >= duration:
+                break
+            segments.append((end - start, used / self.memory_gb))
+            used -= self.tasks[task_id].get('memory_required', self.memory_gb)
+            start = end
+        segments.append((duration - start, used / self.memory_gb))
+        onset = throttle_time(self.telemetry.temperature, segments)
+        if onset is None:
+            return 0.0
+        load = next(load for length, load in reversed(segments))
+        return min((duration - onset) * throttled_share(load) / duration, 1.0)
+    
+    def available_at(self, memory_required: float) -> Optional[float]:
+        """Earliest expected time at which ``memory_required`` GB will be free
         
-        # Start background processes
-        self.telemetry_process = env.process(self._update_telemetry())
+        Releases the memory of running tasks in order of their expected end
+        at the current speed; a throttled node is not available before it
+        is expected to have cooled down. None if the task can never fit on
+        the node.
+        """
+        if self.telemetry.state == GPUState.OFFLINE or memory_required > self.memory_gb:
+            return None
+        available = self.env.now
+        if self.telemetry.state == GPUState.THROTTLED:
+            available += max(self.telemetry.temperature - RECOVERY_TEMPERATURE, 0.0) / COOLING_MEAN
+        free = self.free_memory
+        for end, task_id in sorted((end, task_id) for task_id, end in self.task_ends.items()):
+            if free >= memory_required:
+                break
+            free += self.tasks[task_id].get('memory_required', self.memory_gb)
+            available = max(available, end)
+        return available
     
     def _update_telemetry(self):
         """Continuously update telemetry data based on current state"""
         while True:
-            if self.telemetry.state == GPUState.BUSY and self.current_task:
-                # Increase temperature and power when busy
-                self.telemetry.temperature = min(
-                    self.telemetry.temperature + random.uniform(0.5, 2.0),
-                    95.0  # Absolute max
-                )
-                self.telemetry.power_usage = random.uniform(200, 300)
-                self.telemetry.utilization = random.uniform(80, 99)
+            if self.telemetry.state == GPUState.BUSY and self.tasks:
+                # Heat, power and utilization follow the combined load of the running tasks
+                load = self.load
+                temperature = (self.telemetry.temperature + self.rng.uniform(*HEATING) * load
+                               - self.rng.uniform(*COOLING) * (1 - load))
+                self.telemetry.temperature = min(max(temperature, ROOM_TEMPERATURE), MAX_TEMPERATURE)
+                self.telemetry.power_usage = self.rng.uniform(10, 30) + self.rng.uniform(190, 270) * load
+                self.telemetry.utilization = self.rng.uniform(80, 99) * load
             else:
                 # Cool down when idle
                 self.telemetry.temperature = max(
-                    self.telemetry.temperature - random.uniform(0.1, 0.5),
-                    25.0  # Room temperature
+                    self.telemetry.temperature - self.rng.uniform(*COOLING),
+                    ROOM_TEMPERATURE
                 )
-                self.telemetry.power_usage = random.uniform(10, 30)
+                self.telemetry.power_usage = self.rng.uniform(10, 30)
                 self.telemetry.utilization = 0.0
                 
             # Check for thermal throttling
-            if self.telemetry.temperature > 85:
-                self.telemetry.state = GPUState.THROTTLED
-            elif self.telemetry.state == GPUState.THROTTLED and self.telemetry.temperature < 80:
-                self.telemetry.state = GPUState.IDLE
+            if self.telemetry.temperature > THROTTLE_TEMPERATURE:
+                self.set_state(GPUState.THROTTLED)
+            elif self.telemetry.state == GPUState.THROTTLED and self.telemetry.temperature < RECOVERY_TEMPERATURE:
+                # Recover to BUSY if a task is still running on the node
+                self.set_state(GPUState.BUSY if self.tasks else GPUState.IDLE)
                 
             yield self.env.timeout(1)  # Update every simulated second
     
     def execute_task(self, task: Dict[str, Any]) -> simpy.Event:
-        """Execute a task on this GPU node"""
-        if self.telemetry.state in [GPUState.BUSY, GPUState.THROTTLED]:
+        """Execute a task on this GPU node alongside any tasks already running
+        
+        The task holds ``memory_required`` GB (the whole node if unset)
+        until it ends.
+        """
+        if self.telemetry.state not in [GPUState.IDLE, GPUState.BUSY]:
             raise ValueError("GPU is not available for task execution")
+        memory_required = task.get('memory_required', self.memory_gb)
+        if memory_required > self.free_memory:
+            raise ValueError(f"Not enough free memory ({memory_required} GB requested, {self.free_memory} GB free)")
         
-        self.current_task = task
-        self.telemetry.state = GPUState.BUSY
-        self.task_completion_event = self.env.event()
+        task_id = task.get('task_id', str(id(task)))
+        task_duration = task.get('duration', 10)
+        self.tasks[task_id] = task
+        self.task_ends[task_id] = self.env.now + task_duration / self.speed
+        self.used_memory += memory_required
+        self.telemetry.memory_usage = self.used_memory
+        self.set_state(GPUState.BUSY)
+        completion = self.env.event()
         
         # Simulate task execution
-        task_duration = task.get('duration', 10)
-        self.env.process(self._run_task(task_duration))
+        self.task_processes[task_id] = self.env.process(self._run_task(task_id, task_duration, completion))
+        self._notify_capacity()
         
-        return self.task_completion_event
+        return completion
+    
+    def _notify_capacity(self):
+        for listener in self.capacity_listeners:
+            listener(self)
     
-    def _run_task(self, duration: int):
-        """Internal task execution process"""
+    def _release(self, task_id: str):
+        """Free the memory of a task that has ended"""
+        task = self.tasks.pop(task_id)
+        del self.task_processes[task_id]
+        self.task_ends.pop(task_id, None)
+        self.used_memory = max(self.used_memory - task.get('memory_required', self.memory_gb), 0.0)
+        if not self.tasks:
+            # Don't let float rounding leave a sliver of memory in use
+            self.used_memory = 0.0
+        self.telemetry.memory_usage = self.used_memory
+        if not self.tasks and self.telemetry.state == GPUState.BUSY:
+            # A throttled node stays blocked until it has cooled down
+            self.set_state(GPUState.IDLE)
+        self._notify_capacity()
+    
+    def _run_task(self, task_id: str, duration: float, completion: simpy.Event):
+        """Internal task execution process
+        
+        ``duration`` is the work at full speed; while the node is throttled
+        the task progresses at ``Config.THROTTLE_SPEED``.
+        """
+        remaining = duration
         try:
-            yield self.env.timeout(duration)
-            self.current_task = None
-            self.telemetry.state = GPUState.IDLE
-            if self.task_completion_event:
-                self.task_completion_event.succeed({"status": "completed", "node_id": self.node_id})
-        except simpy.Interrupt:
-            if self.task_completion_event:
-                self.task_completion_event.fail({"status": "failed", "node_id": self.node_id})
+            while True:
+                started, speed = self.env.now, self.speed
+                self.task_ends[task_id] = started + remaining / speed
+                finished = self.env.timeout(remaining / speed)
+                yield finished | self._speed_changed
+                remaining -= (self.env.now - started) * speed
+                if finished.processed or remaining <= 1e-9:
+                    break
+            self._release(task_id)
+            completion.succeed({"status": "completed", "node_id": self.node_id})
+        except simpy.Interrupt as interrupt:
+            work_done = duration - remaining + (self.env.now - started) * speed
+            self._release(task_id)
+            completion.fail(TaskFailed(self.node_id, interrupt.cause, work_done))
     
     def get_status(self) -> Dict[str, Any]:
         """Get current status of the GPU node"""
@@ -100,4 +258,6 @@ class GPUNode:
                 "utilization": round(self.telemetry.utilization, 2),
             },
             "current_task": self.current_task,
+            "task_ids": list(self.tasks),
+            "free_memory": self.free_memory,
         }
\ No newline at end of file
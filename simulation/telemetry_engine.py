@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+from .gpu_node import GPUState
+from .thermal import COOLING, HEATING, MAX_TEMPERATURE, RECOVERY_TEMPERATURE, ROOM_TEMPERATURE, THROTTLE_TEMPERATURE
+
+# GPUState <-> int8 code used by the state array
+STATES = list(GPUState)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+IDLE = STATE_CODES[GPUState.IDLE]
+BUSY = STATE_CODES[GPUState.BUSY]
+THROTTLED = STATE_CODES[GPUState.THROTTLED]
+
+
+class TelemetryView:
+    """GPUTelemetry-compatible view onto one row of a TelemetryEngine"""
+    
+    __slots__ = ("_engine", "_index")
+    
+    def __init__(self, engine: "TelemetryEngine", index: int):
+        self._engine = engine
+        self._index = index
+    
+    @property
+    def temperature(self) -> float:
+        return float(self._engine.temperature[self._index])
+    
+    @temperature.setter
+    def temperature(self, value: float):
+        self._engine.temperature[self._index] = value
+    
+    @property
+    def power_usage(self) -> float:
+        return float(self._engine.power_usage[self._index])
+    
+    @power_usage.setter
+    def power_usage(self, value: float):
+        self._engine.power_usage[self._index] = value
+    
+    @property
+    def memory_usage(self) -> float:
+        return float(self._engine.memory_usage[self._index])
+    
+    @memory_usage.setter
+    def memory_usage(self, value: float):
+        self._engine.memory_usage[self._index] = value
+    
+    @property
+    def utilization(self) -> float:
+        return float(self._engine.utilization[self._index])
+    
+    @utilization.setter
+    def utilization(self, value: float):
+        self._engine.utilization[self._index] = value
+    
+    @property
+    def state(self) -> GPUState:
+        return STATES[self._engine.state[self._index]]
+    
+    @state.setter
+    def state(self, value: GPUState):
+        self._engine.state[self._index] = STATE_CODES[value]
+
+
+class TelemetryEngine:
+    """Grid-level telemetry stored as struct-of-arrays and updated in one batched tick
+    
+    Replaces the per-node ``GPUNode._update_telemetry`` processes: a single
+    SimPy process advances every node once per ``interval`` simulated
+    seconds with the same heating, cooling and throttling rules. State
+    transitions still go through ``GPUNode.set_state`` so listeners such as
+    the availability index stay in sync.
+    """
+    
+    def __init__(self, env, num_nodes: int, seed: Optional[int] = None, interval: float = 1.0):
+        self.env = env
+        self.interval = interval
+        self.rng = np.random.default_rng(seed)
+        self.temperature = np.full(num_nodes, 30.0)
+        self.power_usage = np.zeros(num_nodes)
+        self.memory_usage = np.zeros(num_nodes)
+        self.memory_gb = np.ones(num_nodes)
+        self.utilization = np.zeros(num_nodes)
+        self.state = np.full(num_nodes, IDLE, dtype=np.int8)
+        self.nodes: List = [None] * num_nodes
+        self.process = env.process(self._run())
+    
+    def view(self, node) -> TelemetryView:
+        """Register a node and return its telemetry view"""
+        self.nodes[node.node_id] = node
+        self.memory_gb[node.node_id] = node.memory_gb or 1.0
+        return TelemetryView(self, node.node_id)
+    
+    def _run(self):
+        while True:
+            self.tick()
+            yield self.env.timeout(self.interval)
+    
+    def tick(self):
+        """Advance telemetry of all nodes by one step"""
+        rng = self.rng
+        busy = self.state == BUSY
+        num_busy = int(np.count_nonzero(busy))
+        idle = ~busy
+        num_idle = len(busy) - num_busy
+        
+        # Heat up and draw power in proportion to the memory share held by running tasks
+        if num_busy:
+            load = self.memory_usage[busy] / self.memory_gb[busy]
+            temperature = (self.temperature[busy] + rng.uniform(*HEATING, num_busy) * load
+                           - rng.uniform(*COOLING, num_busy) * (1 - load))
+            self.temperature[busy] = np.clip(temperature, ROOM_TEMPERATURE, MAX_TEMPERATURE)
+            self.power_usage[busy] = rng.uniform(10, 30, num_busy) + rng.uniform(190, 270, num_busy) * load
+            self.utilization[busy] = rng.uniform(80, 99, num_busy) * load
+        
+        # Cool down when idle
+        if num_idle:
+            self.temperature[idle] = np.maximum(
+                self.temperature[idle] - rng.uniform(*COOLING, num_idle), ROOM_TEMPERATURE
+            )
+            self.power_usage[idle] = rng.uniform(10, 30, num_idle)
+            self.utilization[idle] = 0.0
+        
+        # Thermal throttling transitions
+        throttled = self.state == THROTTLED
+        for index in np.flatnonzero((self.temperature > THROTTLE_TEMPERATURE) & ~throttled):
+            self.nodes[index].set_state(GPUState.THROTTLED)
+        for index in np.flatnonzero(throttled & (self.temperature < RECOVERY_TEMPERATURE)):
+            node = self.nodes[index]
+            node.set_state(GPUState.BUSY if node.tasks else GPUState.IDLE)
+
+    def node_statuses(self) -> List[Dict[str, Any]]:
+        """``GPUNode.get_status()`` for every node, rounded in one vectorized pass"""
+        temperature = np.round(self.temperature, 2).tolist()
+        power_usage = np.round(self.power_usage, 2).tolist()
+        memory_usage = np.round(self.memory_usage, 2).tolist()
+        utilization = np.round(self.utilization, 2).tolist()
+        states = [STATES[code].value for code in self.state.tolist()]
+        return [
+            {
+                "node_id": node.node_id,
+                "gpu_type": node.gpu_type,
+                "state": states[i],
+                "telemetry": {
+                    "temperature": temperature[i],
+                    "power_usage": power_usage[i],
+                    "memory_usage": memory_usage[i],
+                    "utilization": utilization[i],
+                },
+                "current_task": node.current_task,
+                "task_ids": list(node.tasks),
+                "free_memory": node.free_memory,
+            }
+            for i, node in enumerate(self.nodes)
+        ]
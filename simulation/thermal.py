@@ -0,0 +1,49 @@
+"""Thermal model shared by the telemetry updates and the schedulers' lookahead
+
+Temperatures change once per simulated second: a node heats by
+``HEATING`` °C/s scaled by its load and cools by ``COOLING`` °C/s scaled
+by the idle share. The projections below use the expected values of those
+rates. They are scalar and NumPy-free, so the thermal model does not pull
+NumPy into every grid; the batch scheduler has a vectorized counterpart.
+"""
+from typing import Iterable, Optional, Tuple
+
+ROOM_TEMPERATURE = 25.0
+MAX_TEMPERATURE = 95.0
+THROTTLE_TEMPERATURE = 85.0  # Nodes throttle above this
+RECOVERY_TEMPERATURE = 80.0  # and resume below this
+HEATING = (0.5, 2.0)  # °C per second at full load (uniform range)
+COOLING = (0.1, 0.5)  # °C per second when idle or throttled (uniform range)
+
+HEATING_MEAN = sum(HEATING) / 2
+COOLING_MEAN = sum(COOLING) / 2
+# Expected seconds a throttled node needs to cool back to the recovery temperature
+RECOVERY_TIME = (THROTTLE_TEMPERATURE - RECOVERY_TEMPERATURE) / COOLING_MEAN
+
+
+def heating_rate(load):
+    """Expected temperature change (°C/s) at a load between 0 and 1"""
+    return HEATING_MEAN * load - COOLING_MEAN * (1 - load)
+
+
+def throttle_time(temperature: float, segments: Iterable[Tuple[float, float]]) -> Optional[float]:
+    """Seconds until a node is expected to throttle, or None if it stays below the limit
+    
+    ``segments`` are consecutive (seconds, load) pieces of the horizon, e.g.
+    the load dropping as running tasks finish.
+    """
+    elapsed = 0.0
+    for seconds, load in segments:
+        rate = heating_rate(load)
+        if rate > 0 and temperature + rate * seconds > THROTTLE_TEMPERATURE:
+            return elapsed + max(THROTTLE_TEMPERATURE - temperature, 0.0) / rate
+        temperature = max(temperature + rate * seconds, ROOM_TEMPERATURE)
+        elapsed += seconds
+    return None
+
+
+def throttled_share(load: float) -> float:
+    """Expected share of time spent throttled once a node cycles at a sustained load"""
+    rate = max(heating_rate(load), 1e-9)
+    reheat_time = (THROTTLE_TEMPERATURE - RECOVERY_TEMPERATURE) / rate
+    return RECOVERY_TIME / (RECOVERY_TIME + reheat_time)
@@ -0,0 +1,183 @@
+import bisect
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+METRICS = ("temperature", "power_usage", "memory_usage", "utilization")
+
+
+class _Ring:
+    """Preallocated ring of samples for every node and metric
+    
+    ``data`` has shape (capacity, nodes, columns) so one tick is a single
+    contiguous write; ``times`` holds the timestamp of each slot.
+    """
+    
+    def __init__(self, capacity: int, num_nodes: int, columns: int):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, num_nodes, columns), dtype=np.float32)
+        self.times = np.zeros(capacity)
+        self.count = 0  # samples ever written
+    
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+    
+    def __getitem__(self, i: int) -> float:
+        # Logical (oldest first) index -> timestamp, so ``bisect`` can search the ring in place
+        return self.times[self._slot(i)]
+    
+    def _slot(self, i: int) -> int:
+        return (self.count - len(self) + i) % self.capacity
+    
+    def append(self, timestamp: float, values: np.ndarray):
+        slot = self.count % self.capacity
+        self.data[slot] = values
+        self.times[slot] = timestamp
+        self.count += 1
+    
+    def read(self, node_id: int, start: float, end: float, period: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and values of one node covering [start, end], touching only those slots
+        
+        A sample stamped ``t`` covers ``[t, t + period)``, so with a
+        ``period`` the bucket containing ``start`` is included.
+        """
+        lo = bisect.bisect_right(self, start - period) if period else bisect.bisect_left(self, start)
+        hi = bisect.bisect_right(self, end)
+        if lo >= hi:
+            return np.empty(0), np.empty((0, self.data.shape[2]), dtype=self.data.dtype)
+        first, last = self._slot(lo), self._slot(hi - 1)
+        if first <= last:
+            return self.times[first:last + 1], self.data[first:last + 1, node_id]
+        # The range wraps around the end of the buffer
+        return (np.concatenate((self.times[first:], self.times[:last + 1])),
+                np.concatenate((self.data[first:, node_id], self.data[:last + 1, node_id])))
+
+
+class _Rollup:
+    """Downsampled min/mean/max of every metric over fixed ``period`` buckets"""
+    
+    def __init__(self, period: float, capacity: int, num_nodes: int):
+        self.period = period
+        metrics = len(METRICS)
+        self.ring = _Ring(capacity, num_nodes, 3 * metrics)
+        self._bucket: Optional[int] = None
+        self._sum = np.zeros((num_nodes, metrics))
+        self._min = np.zeros((num_nodes, metrics))
+        self._max = np.zeros((num_nodes, metrics))
+        self._samples = 0
+    
+    def add(self, timestamp: float, values: np.ndarray):
+        bucket = int(timestamp // self.period)
+        if bucket != self._bucket:
+            self.flush()
+            self._bucket = bucket
+            self._sum[:] = values
+            self._min[:] = values
+            self._max[:] = values
+            self._samples = 1
+            return
+        self._sum += values
+        np.minimum(self._min, values, out=self._min)
+        np.maximum(self._max, values, out=self._max)
+        self._samples += 1
+    
+    def flush(self):
+        if self._samples:
+            self.ring.append(self._bucket * self.period,
+                             np.concatenate((self._min, self._sum / self._samples, self._max), axis=1))
+            self._samples = 0
+
+
+class TelemetryHistory:
+    """Per-node, per-metric telemetry history with predictable memory use
+    
+    Raw samples go into a fixed-size ring buffer and are also folded into
+    downsampled rollups (min/mean/max per ``period``), each with its own
+    fixed-size ring. All buffers are allocated up front, so memory is
+    ``memory_bytes`` regardless of how long the simulation runs.
+    """
+    
+    def __init__(self, num_nodes: int, raw_capacity: int = 300,
+                 rollups: Optional[Dict[float, int]] = None, interval: float = 1.0):
+        if rollups is None:
+            rollups = {10: 360, 60: 720}
+        self.num_nodes = num_nodes
+        self.interval = interval
+        self.raw = _Ring(raw_capacity, num_nodes, len(METRICS))
+        self.rollups = [_Rollup(float(period), int(capacity), num_nodes)
+                        for period, capacity in sorted((float(p), c) for p, c in rollups.items())]
+    
+    @property
+    def memory_bytes(self) -> int:
+        rings = [self.raw] + [rollup.ring for rollup in self.rollups]
+        return sum(ring.data.nbytes + ring.times.nbytes for ring in rings)
+    
+    def record(self, timestamp: float, values: np.ndarray):
+        """Store one sample of shape (nodes, len(METRICS))"""
+        self.raw.append(timestamp, values)
+        for rollup in self.rollups:
+            rollup.add(timestamp, values)
+    
+    def sample(self, grid) -> np.ndarray:
+        """Current telemetry of every node in ``grid`` as a (nodes, metrics) array"""
+        engine = grid.telemetry_engine
+        if engine is not None:
+            return np.stack([getattr(engine, metric) for metric in METRICS], axis=1)
+        return np.array([[getattr(node.telemetry, metric) for metric in METRICS] for node in grid.nodes])
+    
+    def run(self, grid):
+        """SimPy process recording the grid every ``interval`` simulated seconds"""
+        while True:
+            self.record(grid.env.now, self.sample(grid))
+            yield grid.env.timeout(self.interval)
+    
+    def query(self, node_id: int, start: Optional[float] = None, end: Optional[float] = None,
+              step: Optional[float] = None) -> Dict[str, Any]:
+        """Range read for one node
+        
+        Picks the coarsest resolution whose period does not exceed ``step``
+        (raw samples by default). If that level no longer holds ``start``,
+        coarser rollups with longer retention are used instead.
+        """
+        step = self.interval if step is None else step
+        levels: List[Tuple[float, _Ring]] = [(self.interval, self.raw)]
+        levels += [(rollup.period, rollup.ring) for rollup in self.rollups]
+        
+        index = 0
+        for i, (period, _) in enumerate(levels):
+            if period <= step:
+                index = i
+        if start is not None:
+            while (index + 1 < len(levels) and not self._holds(levels[index][1], start)
+                   and self._oldest(levels[index + 1][1]) < self._oldest(levels[index][1])):
+                index += 1
+        period, ring = levels[index]
+        
+        # Rollups are stamped with their bucket start; include the bucket holding ``start``
+        times, values = ring.read(node_id,
+                                  float("-inf") if start is None else start,
+                                  float("inf") if end is None else end,
+                                  0.0 if ring is self.raw else period)
+        values = np.round(values.astype(float), 2)
+        result: Dict[str, Any] = {"node_id": node_id, "step": period, "timestamps": times.tolist()}
+        metrics = len(METRICS)
+        if ring is self.raw:
+            result["metrics"] = {metric: values[:, i].tolist() for i, metric in enumerate(METRICS)}
+        else:
+            result["metrics"] = {
+                metric: {
+                    "min": values[:, i].tolist(),
+                    "mean": values[:, metrics + i].tolist(),
+                    "max": values[:, 2 * metrics + i].tolist(),
+                }
+                for i, metric in enumerate(METRICS)
+            }
+        return result
+    
+    @staticmethod
+    def _oldest(ring: _Ring) -> float:
+        return ring[0] if len(ring) else float("inf")
+    
+    @classmethod
+    def _holds(cls, ring: _Ring, start: float) -> bool:
+        return cls._oldest(ring) <= start
@@ -0,0 +1,88 @@
+import bz2
+import csv
+import gzip
+import lzma
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, TextIO
+
+from .workloads import Job
+
+PRIORITIES = ("low", "medium", "high", "critical")
+
+# Trace column holding each job field (task_id is optional)
+DEFAULT_COLUMNS = {
+    "task_id": "task_id",
+    "arrival": "arrival",
+    "duration": "duration",
+    "memory_required": "memory",
+    "priority": "priority",
+}
+
+
+@dataclass
+class TraceSpec:
+    """A job trace to replay
+
+    ``path`` is a CSV file with a header row, optionally compressed
+    (``.gz``, ``.bz2`` or ``.xz``), sorted by arrival time. ``columns``
+    maps job fields to trace columns, overriding ``DEFAULT_COLUMNS``.
+    Only jobs arriving in ``[start, end)`` (trace seconds) are replayed,
+    with arrivals shifted so the window starts at 0. Arrivals and
+    durations are divided by ``time_scale``, so a scale of 60 replays an
+    hour of trace in a simulated minute. ``priorities`` maps trace values
+    to priority names; values that already are priority names pass
+    through and anything else becomes ``default_priority``.
+    """
+    path: str
+    start: Optional[float] = None
+    end: Optional[float] = None
+    time_scale: float = 1.0
+    columns: Dict[str, str] = field(default_factory=dict)
+    priorities: Dict[str, str] = field(default_factory=dict)
+    default_priority: str = "medium"
+
+
+def _open(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", newline="")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+def read_trace(spec: TraceSpec) -> Iterator[Job]:
+    """Lazily read the jobs of a trace, one row at a time
+
+    Rows with a missing or non-positive duration or memory are skipped.
+    Reading stops at the first job past ``spec.end``, so memory use does
+    not depend on the size of the trace.
+    """
+    columns = {**DEFAULT_COLUMNS, **spec.columns}
+    offset = spec.start
+    with _open(spec.path) as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            try:
+                arrival = float(row[columns["arrival"]])
+                duration = float(row[columns["duration"]])
+                memory_required = float(row[columns["memory_required"]])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if spec.start is not None and arrival < spec.start:
+                continue
+            if spec.end is not None and arrival >= spec.end:
+                break
+            if duration <= 0 or memory_required <= 0:
+                continue
+            if offset is None:
+                offset = arrival
+            priority = (row.get(columns["priority"]) or "").strip()
+            priority = spec.priorities.get(priority, priority.lower())
+            yield Job(
+                task_id=row.get(columns["task_id"]) or f"trace-{i}",
+                arrival=(arrival - offset) / spec.time_scale,
+                duration=duration / spec.time_scale,
+                memory_required=memory_required,
+                priority=priority if priority in PRIORITIES else spec.default_priority,
+            )
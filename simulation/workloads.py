@@ -0,0 +1,68 @@
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+
+@dataclass(frozen=True)
+class Job:
+    """A task to submit at ``arrival`` simulated seconds"""
+    task_id: str
+    arrival: float
+    duration: float
+    memory_required: float
+    priority: str = "medium"
+
+
+@dataclass
+class WorkloadSpec:
+    """Parameters of a synthetic workload
+    
+    ``arrival`` is ``"poisson"`` (exponential inter-arrival times at
+    ``rate`` tasks per second) or ``"bursty"`` (bursts of ``burst_size``
+    tasks arriving together, with Poisson burst times at the same mean
+    rate). Durations follow a Pareto distribution (heavy tail, shape
+    ``duration_alpha``, minimum ``duration_min``) clipped to
+    ``duration_max``. Memory and priority are drawn from weighted mixes.
+    """
+    num_tasks: int = 1000
+    arrival: str = "poisson"
+    rate: float = 1.0
+    burst_size: int = 50
+    duration_alpha: float = 1.5
+    duration_min: float = 5.0
+    duration_max: int = 300
+    memory_mix: Dict[float, float] = field(default_factory=lambda: {
+        2: 0.3, 4: 0.25, 8: 0.2, 16: 0.15, 24: 0.1,
+    })
+    priority_mix: Dict[str, float] = field(default_factory=lambda: {
+        "low": 0.3, "medium": 0.5, "high": 0.15, "critical": 0.05,
+    })
+
+
+def generate(spec: WorkloadSpec, seed: Optional[int] = None) -> Iterator[Job]:
+    """Lazily generate the jobs of a workload, in arrival order"""
+    rng = random.Random(seed)
+    memories, memory_weights = zip(*spec.memory_mix.items())
+    priorities, priority_weights = zip(*spec.priority_mix.items())
+    
+    now = 0.0
+    burst_left = 0
+    for i in range(spec.num_tasks):
+        if spec.arrival == "poisson":
+            now += rng.expovariate(spec.rate)
+        elif spec.arrival == "bursty":
+            if burst_left == 0:
+                now += rng.expovariate(spec.rate / spec.burst_size)
+                burst_left = spec.burst_size
+            burst_left -= 1
+        else:
+            raise ValueError(f"Unknown arrival process: {spec.arrival}")
+        
+        duration = spec.duration_min * rng.paretovariate(spec.duration_alpha)
+        yield Job(
+            task_id=f"job-{i}",
+            arrival=now,
+            duration=max(1, min(spec.duration_max, int(round(duration)))),
+            memory_required=rng.choices(memories, memory_weights)[0],
+            priority=rng.choices(priorities, priority_weights)[0],
+        )
@@ -0,0 +1,247 @@
+"""Parallel parameter sweeps over headless benchmark runs
+
+Expands a parameter grid (Config fields, schedulers, node counts,
+workload fields) times a number of seeds into independent replicas, runs
+them across a process pool, streams each result as it finishes and
+aggregates the replicas of every configuration into a summary with 95%
+confidence intervals.
+
+    python sweep.py --scheduler fifo intelligent --nodes 32 64 --seeds 8 \\
+        --config 'SCHEDULER_WEIGHTS=[{"temperature": 0.4, "memory": 0.3, "utilization": 0.3},
+                                     {"temperature": 0.6, "memory": 0.2, "utilization": 0.2}]'
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from bench import SCHEDULERS, run_benchmark
+from config import Config
+from simulation.workloads import WorkloadSpec
+
+# Metrics aggregated across seeds
+SUMMARY_METRICS = [
+    "makespan",
+    "utilization",
+    "stretch.mean",
+    "queue_wait.p50",
+    "queue_wait.p95",
+    "queue_wait.p99",
+    "queue_wait_by_priority.critical.p99",
+    "preemptions",
+    "decisions_per_second",
+    "schedule_pass_ms.p95",
+]
+
+# Two-sided 95% Student t critical values by degrees of freedom
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+        9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042,
+        40: 2.021, 60: 2.000, 120: 1.980}
+
+
+def _t95(df: int) -> float:
+    """Two-sided 95% t value, rounded down to the nearest tabulated df so the CI is never too narrow"""
+    return _T95[max(bound for bound in _T95 if bound <= df)]
+
+
+def expand_grid(grid: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Cartesian product of a sweep grid, one dict per replica
+    
+    ``grid`` has ``scheduler``, ``num_nodes`` and ``seeds`` lists plus
+    ``config`` and ``workload`` mappings of field -> list of values.
+    """
+    config_grid = grid.get("config", {})
+    workload_grid = grid.get("workload", {})
+    config_keys, workload_keys = list(config_grid), list(workload_grid)
+    for scheduler, num_nodes, config_values, workload_values in itertools.product(
+            grid["scheduler"], grid["num_nodes"],
+            itertools.product(*config_grid.values()), itertools.product(*workload_grid.values())):
+        for seed in grid["seeds"]:
+            yield {
+                "scheduler": scheduler,
+                "num_nodes": num_nodes,
+                "config": dict(zip(config_keys, config_values)),
+                "workload": dict(zip(workload_keys, workload_values)),
+                "seed": seed,
+            }
+
+
+def _workload_spec(fields: Dict[str, Any]) -> WorkloadSpec:
+    """WorkloadSpec from JSON fields, whose ``memory_mix`` keys arrive as strings"""
+    fields = dict(fields)
+    if "memory_mix" in fields:
+        fields["memory_mix"] = {float(memory): weight for memory, weight in fields["memory_mix"].items()}
+    return WorkloadSpec(**fields)
+
+
+def run_replica(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one replica in a worker process with its Config overrides applied"""
+    for key in params["config"]:
+        if not hasattr(Config, key):
+            raise AttributeError(f"Unknown Config field: {key}")
+    saved = {key: getattr(Config, key) for key in params["config"]}
+    try:
+        for key, value in params["config"].items():
+            setattr(Config, key, value)
+        report = run_benchmark(params["scheduler"], params["num_nodes"],
+                               _workload_spec(params["workload"]), params["seed"])
+    finally:
+        # Workers are reused, don't leak overrides into the next replica
+        for key, value in saved.items():
+            setattr(Config, key, value)
+    return {"params": params, "report": report}
+
+
+def _metric(report: Dict[str, Any], path: str) -> float:
+    value: Any = report
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def _group_key(params: Dict[str, Any]) -> str:
+    key = {name: value for name, value in params.items() if name != "seed"}
+    return json.dumps(key, sort_keys=True)
+
+
+def summarize(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mean, standard deviation and 95% CI half-width of each metric, per configuration
+    
+    The CI is None for a configuration with a single replica. Failed
+    replicas are left out of the statistics and counted in ``failed``.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    failed: Dict[str, int] = {}
+    for result in results:
+        key = _group_key(result["params"])
+        if "error" in result:
+            failed[key] = failed.get(key, 0) + 1
+        else:
+            groups.setdefault(key, []).append(result["report"])
+    summary = []
+    for key, reports in groups.items():
+        row: Dict[str, Any] = {"params": json.loads(key), "replicas": len(reports),
+                               "failed": failed.get(key, 0), "metrics": {}}
+        for path in SUMMARY_METRICS:
+            values = [_metric(report, path) for report in reports]
+            n = len(values)
+            mean = sum(values) / n
+            std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else 0.0
+            row["metrics"][path] = {
+                "mean": mean,
+                "std": std,
+                "ci95": _t95(n - 1) * std / math.sqrt(n) if n > 1 else None,
+            }
+        summary.append(row)
+    return summary
+
+
+def format_summary(summary: List[Dict[str, Any]]) -> str:
+    """Plain-text table of a sweep summary"""
+    lines = []
+    header = f"{'configuration':60s} {'n':>3s} " + " ".join(f"{path:>24s}" for path in SUMMARY_METRICS)
+    lines.append(header)
+    lines.append("-" * len(header))
+    for row in summary:
+        params = row["params"]
+        label = f"{params['scheduler']} nodes={params['num_nodes']}"
+        for name, value in list(params["config"].items()) + list(params["workload"].items()):
+            label += f" {name}={json.dumps(value, separators=(',', ':'))}"
+        cells = []
+        for path in SUMMARY_METRICS:
+            metric = row["metrics"][path]
+            ci95 = f"{metric['ci95']:>10.3f}" if metric["ci95"] is not None else f"{'n/a':>10s}"
+            cells.append(f"{metric['mean']:>12.3f} ±{ci95}")
+        lines.append(f"{label[:60]:60s} {row['replicas']:>3d} " + " ".join(cells))
+    return "\n".join(lines)
+
+
+def run_sweep(grid: Dict[str, Any], workers: Optional[int] = None,
+              stream_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run every replica of ``grid`` across a process pool, streaming results as they finish
+    
+    A replica that raises is recorded as ``{"params": ..., "error": ...}``
+    and the sweep carries on with the others.
+    """
+    replicas = list(expand_grid(grid))
+    results = []
+    stream = open(stream_path, "w") if stream_path else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(run_replica, params): params for params in replicas}
+            for done, future in enumerate(as_completed(futures), 1):
+                params = futures[future]
+                progress = f"[{done}/{len(replicas)} {time.perf_counter() - start:7.1f}s]"
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"params": params, "error": f"{type(e).__name__}: {e}"}
+                    print(f"{progress} {params['scheduler']} nodes={params['num_nodes']} "
+                          f"seed={params['seed']} failed: {result['error']}", flush=True)
+                else:
+                    report = result["report"]
+                    print(f"{progress} {report['scheduler']} nodes={report['num_nodes']} seed={report['seed']} "
+                          f"makespan={report['makespan']:.0f} utilization={report['utilization']:.3f} "
+                          f"wait_p95={report['queue_wait']['p95']:.2f}", flush=True)
+                results.append(result)
+                if stream:
+                    stream.write(json.dumps(result) + "\n")
+                    stream.flush()
+    finally:
+        if stream:
+            stream.close()
+    return results
+
+
+def _parse_assignment(text: str):
+    key, _, value = text.partition("=")
+    values = json.loads(value)
+    return key, values if isinstance(values, list) else [values]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Parallel scheduler parameter sweeps")
+    parser.add_argument("--grid", help="JSON file with the sweep grid (overrides the other grid options)")
+    parser.add_argument("--scheduler", nargs="+", choices=sorted(SCHEDULERS), default=["intelligent"])
+    parser.add_argument("--nodes", nargs="+", type=int, default=[64])
+    parser.add_argument("--seeds", type=int, default=5, help="Replicas (seeds 0..N-1) per configuration")
+    parser.add_argument("--config", action="append", default=[], metavar="FIELD=JSON",
+                        help="Config field and a JSON list of values to sweep")
+    parser.add_argument("--workload", action="append", default=[], metavar="FIELD=JSON",
+                        help="WorkloadSpec field and a JSON list of values to sweep")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--results", help="Stream per-replica results to this JSON lines file")
+    parser.add_argument("--output", help="Write the summary to this JSON file")
+    args = parser.parse_args(argv)
+    
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    else:
+        grid = {
+            "scheduler": args.scheduler,
+            "num_nodes": args.nodes,
+            "seeds": list(range(args.seeds)),
+            "config": dict(_parse_assignment(item) for item in args.config),
+            "workload": dict(_parse_assignment(item) for item in args.workload),
+        }
+    
+    results = run_sweep(grid, workers=args.workers, stream_path=args.results)
+    summary = summarize(results)
+    print()
+    print(format_summary(summary))
+    failures = sum(1 for result in results if "error" in result)
+    if failures:
+        print(f"\n{failures} of {len(results)} replicas failed")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()